@@ -0,0 +1,130 @@
+"""Benchmarks of the illustrate drawing primitives.
+
+The benchmarks are written for `asv <https://asv.readthedocs.io>`_, which
+stores the results of each run as JSON files in ``.asv/results``. To
+benchmark the current commit and compare it with a release::
+
+    asv run --python=same
+    asv run v0.6.1^!
+    asv compare v0.6.1 master
+
+Each primitive is timed for a single call and for batches of annotations,
+drawn both one call at a time and, where there is one, with the batch
+method, on canvases from 512 x 512 to 16384 x 16384 pixels.
+"""
+
+import numpy as np
+
+from jicbioimage.illustrate import AnnotatedImage, Canvas, GLYPH_CACHE
+
+CANVAS_SIZES = [512, 4096, 16384]
+BATCH_SIZES = [10, 1000, 100000]
+
+
+def _positions(size, num_items, seed=0):
+    """Return (num_items, 2) array of random positions on a canvas."""
+    random_state = np.random.RandomState(seed)
+    return random_state.randint(0, size, size=(num_items, 2))
+
+
+class FromGrayscale(object):
+    """Create canvases from grayscale images."""
+
+    params = CANVAS_SIZES
+    param_names = ["size"]
+    timeout = 300
+
+    def setup(self, size):
+        random_state = np.random.RandomState(0)
+        self.im = random_state.randint(0, 4096, size=(size, size),
+                                       dtype=np.uint16)
+        self.out = np.empty((size, size, 3), dtype=np.uint8)
+
+    def time_from_grayscale(self, size):
+        AnnotatedImage.from_grayscale(self.im)
+
+    def time_from_grayscale_percentile(self, size):
+        AnnotatedImage.from_grayscale(self.im, normalise="percentile")
+
+    def time_from_grayscale_out(self, size):
+        AnnotatedImage.from_grayscale(self.im, normalise=(0, 4095),
+                                      out=self.out)
+
+
+class SingleCall(object):
+    """Draw a single annotation."""
+
+    params = CANVAS_SIZES
+    param_names = ["size"]
+    timeout = 300
+
+    def setup(self, size):
+        self.canvas = Canvas.blank_canvas(size, size)
+        self.region = np.zeros((size, size), dtype=bool)
+        self.region[size // 4:size // 4 + 64, size // 2:size // 2 + 64] = True
+        self.center = (size // 2, size // 2)
+        GLYPH_CACHE.glyph("123", 12, antialias=False)
+
+    def time_draw_cross(self, size):
+        self.canvas.draw_cross(self.center, radius=8)
+
+    def time_draw_line(self, size):
+        self.canvas.draw_line((0, 0), self.center)
+
+    def time_draw_line_antialias(self, size):
+        self.canvas.draw_line((0, 0), self.center, width=3, antialias=True)
+
+    def time_mask_region(self, size):
+        self.canvas.mask_region(self.region)
+
+    def time_mask_region_alpha(self, size):
+        self.canvas.mask_region(self.region, alpha=0.5)
+
+    def time_text_at(self, size):
+        self.canvas.text_at("123", self.center)
+
+
+class Batch(object):
+    """Draw batches of annotations of a kind."""
+
+    params = (CANVAS_SIZES, BATCH_SIZES)
+    param_names = ["size", "num_items"]
+    timeout = 600
+
+    def setup(self, size, num_items):
+        self.canvas = Canvas.blank_canvas(size, size)
+        self.positions = _positions(size - 16, num_items) + 8
+        self.ends = self.positions + _positions(16, num_items, seed=1) - 8
+        self.segments = np.stack([self.positions, self.ends], axis=1)
+        self.texts = [str(i % 1000) for i in range(num_items)]
+        self.mask = np.ones((6, 6), dtype=bool)
+        for text in set(self.texts):
+            GLYPH_CACHE.glyph(text, 12, antialias=False)
+
+    def time_draw_cross(self, size, num_items):
+        for position in self.positions:
+            self.canvas.draw_cross(position, radius=4)
+
+    def time_draw_crosses(self, size, num_items):
+        self.canvas.draw_crosses(self.positions, radius=4)
+
+    def time_draw_line(self, size, num_items):
+        for pos1, pos2 in self.segments:
+            self.canvas.draw_line(pos1, pos2)
+
+    def time_draw_lines(self, size, num_items):
+        self.canvas.draw_lines(self.segments)
+
+    def time_draw_lines_antialias(self, size, num_items):
+        self.canvas.draw_lines(self.segments, width=3, antialias=True)
+
+    def time_mask_region(self, size, num_items):
+        for position in self.positions:
+            self.canvas.mask_region(self.mask, offset=position)
+
+    def time_text_at(self, size, num_items):
+        for text, position in zip(self.texts, self.positions):
+            self.canvas.text_at(text, position)
+
+    def time_text_at_many(self, size, num_items):
+        self.canvas.text_at_many(self.texts, self.positions)
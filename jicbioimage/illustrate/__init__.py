@@ -22,6 +22,10 @@ One can use it to draw crosses.
 
 >>> canvas.draw_cross(10, 20)
 
+When drawing many annotations it is much faster to draw them all in one call.
+
+>>> canvas.draw_crosses([(10, 20), (30, 5)], radius=2)
+
 One can use it to mask out bitmaps (in the example below with the color cyan).
 
 >>> bitmap = np.zeros((50, 50), dtype=bool)
@@ -34,13 +38,16 @@ One can use it to add text at particular locations on the canvas.
 
 """
 
+import importlib
 import os.path
+import threading
+from collections import OrderedDict
 
-import PIL.ImageFont
 import numpy as np
-import skimage.draw
 
-import jicbioimage.core.image
+# PIL, skimage.draw, multiprocessing.pool and jicbioimage.core.image take a
+# long time to import, so they are imported by the functions that use them
+# when those are first called.
 
 __version__ = "0.6.1"
 
@@ -48,62 +55,1106 @@ HERE = os.path.dirname(__file__)
 DEFAULT_FONT_PATH = os.path.join(HERE, "fonts", "UbuntuMono-R.ttf")
 
 
-class Canvas(jicbioimage.core.image._BaseImage):
+def _glyph_array(mask):
+    """Return a PIL glyph mask as a 2D uint8 numpy array.
+
+    :param mask: mask returned by :func:`PIL.ImageFont.FreeTypeFont.getmask`
+    :returns: :class:`numpy.ndarray` of shape (height, width)
+    """
+    import PIL.Image
+    image = PIL.Image.frombytes("L", mask.size, bytes(mask))
+    return np.array(image, dtype=np.uint8)
+
+
+def _ragged_arange(lengths):
+    """Return concatenated aranges and the index of the range of each value.
+
+    >>> _ragged_arange([2, 3])
+    (array([0, 1, 0, 1, 2]), array([0, 0, 1, 1, 1]))
+
+    :param lengths: sequence of range lengths
+    :returns: tuple of :class:`numpy.ndarray` (values, range indices)
+    """
+    lengths = np.asarray(lengths, dtype=int)
+    item = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.arange(item.size) - starts, item
+
+
+def _line_coordinates(starts, ends):
+    """Return the pixel coordinates of many lines.
+
+    Gives the same pixels as :func:`skimage.draw.line` for each line.
+
+    :param starts: (N, 2) integer array of (row, col) start positions
+    :param ends: (N, 2) integer array of (row, col) end positions
+    :returns: tuple of :class:`numpy.ndarray` (rows, cols, line indices)
+    """
+    starts = np.asarray(starts, dtype=int).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=int).reshape(-1, 2)
+    delta = ends - starts
+    num_steps = np.abs(delta).max(axis=1)
+    lengths = num_steps + 1
+    step, item = _ragged_arange(lengths)
+
+    # Closed form of the Bresenham error term used by skimage.draw.line;
+    # along the major axis it reduces to the step itself.
+    n = np.repeat(num_steps, lengths)
+    denominator = np.maximum(2 * n, 1)
+    rr, cc = [
+        np.repeat(starts[:, axis], lengths)
+        + np.repeat(np.sign(delta[:, axis]), lengths)
+        * ((np.repeat(2 * np.abs(delta[:, axis]), lengths) * step + n)
+           // denominator)
+        for axis in (0, 1)]
+    return rr, cc, item
+
+
+def _coverage(pixels):
+    """Return the coverage of the pixels returned by a coordinates function.
+
+    :param pixels: (rows, cols, colors) or (rows, cols, colors, coverage)
+                   tuple
+    :returns: array of coverage or None
+    """
+    return pixels[3] if len(pixels) > 3 else None
+
+
+def _thick_line_coordinates(starts, ends, widths, antialias):
+    """Return the pixel coordinates and coverage of many thick lines.
+
+    A line covers the pixels whose centers lie closer than half its width
+    to the segment, giving round end caps. With antialiasing the coverage of a
+    pixel falls off linearly from 1 to 0 over the pixel straddling the
+    edge of the line.
+
+    Each line is walked along its major axis, generating a short run of
+    candidate pixels across the minor axis at every step, so the work is
+    proportional to the area of the line rather than of its bounding box.
+
+    :param starts: (N, 2) array of (row, col) start positions
+    :param ends: (N, 2) array of (row, col) end positions
+    :param widths: (N,) array of line widths
+    :param antialias: whether or not to compute partial coverage
+    :returns: tuple of :class:`numpy.ndarray` (rows, cols, line indices,
+              coverage in the range 0-1)
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+    delta = ends - starts
+    if not antialias:
+        # Shift the lines sideways by a tiny amount, so that rows of pixel
+        # centers exactly half a width from a line are only covered on one
+        # side of it and lines of even width are drawn at that width.
+        norm = np.hypot(delta[:, 0], delta[:, 1])[:, np.newaxis]
+        normal = np.divide(delta[:, ::-1] * [1, -1], norm,
+                           out=np.zeros_like(delta), where=norm > 0)
+        starts = starts + 1e-6 * normal
+    radius = np.asarray(widths, dtype=float) / 2.
+    reach = radius + 0.5 if antialias else radius
+    index = np.arange(len(starts))
+    major = np.argmax(np.abs(delta), axis=1)
+    minor = 1 - major
+    major_delta = delta[index, major]
+    slope = np.divide(delta[index, minor], major_delta,
+                      out=np.zeros(len(starts)), where=major_delta != 0)
+    # Half the extent of the line across the minor axis.
+    half_span = reach * np.sqrt(1 + slope ** 2)
+    major_start = starts[index, major]
+    first = np.ceil(np.minimum(major_start, ends[index, major])
+                    - reach).astype(int)
+    last = np.floor(np.maximum(major_start, ends[index, major])
+                    + reach).astype(int)
+    num_steps = np.maximum(last - first + 1, 0)
+    span = np.floor(2 * half_span).astype(int) + 2
+    counts = num_steps * span
+    position, item = _ragged_arange(counts)
+    step, across = np.divmod(position, np.repeat(span, counts))
+
+    def repeat(values):
+        return np.repeat(values, counts)
+
+    along = repeat(first) + step
+    center = repeat(starts[index, minor]) + repeat(slope) * (
+        along - repeat(major_start))
+    across += np.ceil(center - repeat(half_span)).astype(int)
+    is_row_major = repeat(major == 0)
+    rr = np.where(is_row_major, along, across)
+    cc = np.where(is_row_major, across, along)
+
+    # Distance from each pixel center to the closest point of its segment.
+    row_offset = rr - repeat(starts[:, 0])
+    col_offset = cc - repeat(starts[:, 1])
+    row_delta, col_delta = repeat(delta[:, 0]), repeat(delta[:, 1])
+    length = delta[:, 0] ** 2 + delta[:, 1] ** 2
+    t = np.divide(row_offset * row_delta + col_offset * col_delta,
+                  repeat(length), out=np.zeros(len(item)),
+                  where=repeat(length > 0))
+    np.clip(t, 0, 1, out=t)
+    distance = np.hypot(row_offset - t * row_delta,
+                        col_offset - t * col_delta)
+    if antialias:
+        coverage = np.clip(repeat(reach) - distance, 0, 1)
+        keep = coverage > 0
+    else:
+        keep = distance < repeat(radius)
+        coverage = np.ones(len(item))
+    return rr[keep], cc[keep], item[keep], coverage[keep]
+
+
+def _cross_coordinates(positions, radii):
+    """Return the pixel coordinates of many crosses.
+
+    :param positions: (N, 2) integer array of (row, col) centers
+    :param radii: (N,) integer array of radii
+    :returns: tuple of :class:`numpy.ndarray` (rows, cols, cross indices)
+    """
+    arm_lengths = 2 * radii + 1
+    step, item = _ragged_arange(2 * arm_lengths)
+    arm_length = arm_lengths[item]
+    vertical = step >= arm_length
+    offset = step % arm_length - radii[item]
+    rr = positions[item, 0] + np.where(vertical, offset, 0)
+    cc = positions[item, 1] + np.where(vertical, 0, offset)
+    return rr, cc, item
+
+
+def _text_coordinates(texts, positions, color, size, antialias, center):
+    """Return the pixel coordinates and colors of many pieces of text.
+
+    :param texts: array of N texts
+    :param positions: (N, 2) integer array of (row, col) positions
+    :param color: RGB tuple or (N, 3) array of RGB tuples
+    :param size: font size
+    :param antialias: whether or not the text should be antialiased
+    :param center: whether or not the text should be centered on the
+                   positions
+    :returns: tuple (rows, cols, colors) where colors is an RGB tuple or an
+              array with one RGB tuple per pixel
+    """
+    unique_texts, text_indices = np.unique(texts, return_inverse=True)
+    by_text = np.argsort(text_indices, kind="mergesort")
+    splits = np.cumsum(np.bincount(text_indices,
+                                   minlength=len(unique_texts)))[:-1]
+    rows, cols, items, intensities = [], [], [], []
+    for text, item in zip(unique_texts, np.split(by_text, splits)):
+        glyph = GLYPH_CACHE.glyph(str(text), size, antialias)
+        offset = positions[item]
+        if center:
+            offset = offset - np.array(glyph.shape) // 2
+        gr, gc = np.nonzero(glyph)
+        rows.append((offset[:, 0:1] + gr).ravel())
+        cols.append((offset[:, 1:2] + gc).ravel())
+        items.append(np.repeat(item, gr.size))
+        if antialias:
+            intensities.append(np.tile(glyph[gr, gc], item.size))
+    if not rows:
+        empty = np.zeros(0, dtype=int)
+        return empty, empty, color
+    items = np.concatenate(items)
+    order = np.argsort(items, kind="mergesort")
+    rr = np.concatenate(rows)[order]
+    cc = np.concatenate(cols)[order]
+    items = items[order]
+    color = _pixel_colors(color, slice(None), items)
+    if antialias:
+        normalisation = np.concatenate(intensities)[order] / 255.
+        color = np.round(normalisation[:, np.newaxis] * color)
+    return rr, cc, color
+
+
+def _pixel_colors(color, items, item=None):
+    """Return the colors of a subset of items, optionally one per pixel.
+
+    :param color: RGB tuple or (N, 3) array of RGB tuples
+    :param items: slice selecting the subset of items
+    :param item: index into the subset of the item of each pixel or None
+    :returns: RGB tuple as array, or array with one RGB tuple per item in
+              the subset (if item is None) or per pixel
+    """
+    color = np.asarray(color)
+    if color.ndim == 2:
+        color = color[items]
+        if item is not None:
+            color = color[item]
+    return color
+
+
+def _per_item(value, num_items):
+    """Return scalar or per item sequence as an array with one value per item.
+
+    :param value: scalar or sequence of length num_items
+    :param num_items: number of items
+    :returns: 1D :class:`numpy.ndarray`
+    """
+    return np.broadcast_to(np.asarray(value), (num_items,))
+
+
+def _per_item_colors(color, num_items):
+    """Return RGB tuple or per item RGB tuples as a (num_items, 3) array.
+
+    :param color: RGB tuple or sequence of RGB tuples of length num_items
+    :param num_items: number of items
+    :returns: :class:`numpy.ndarray` of shape (num_items, 3)
+    """
+    return np.broadcast_to(np.asarray(color), (num_items, 3))
+
+
+def _hot(x):
+    """Return (N, 3) array of black-red-yellow-white colors in the range 0-1.
+
+    :param x: array of positions in the range 0-1
+    """
+    return np.clip(np.stack([3 * x, 3 * x - 1, 3 * x - 2], axis=-1), 0, 1)
+
+
+_COLORMAPS = dict(gray=lambda x: np.stack([x, x, x], axis=-1), hot=_hot)
+
+
+def _matplotlib_colormap(name):
+    """Return a matplotlib colormap by name.
+
+    :param name: name of the colormap
+    :returns: :class:`matplotlib.colors.Colormap`
+    :raises: ValueError if matplotlib is not installed or does not know the
+             colormap
+    """
+    try:
+        import matplotlib
+        import matplotlib.cm
+    except ImportError:
+        raise ValueError(
+            "Unknown colormap: {} (matplotlib is not installed)".format(name))
+    try:
+        if hasattr(matplotlib, "colormaps"):
+            return matplotlib.colormaps[name]
+        return matplotlib.cm.get_cmap(name)
+    except (KeyError, ValueError):
+        raise ValueError("Unknown colormap: {}".format(name))
+
+
+def colormap_lut(cmap):
+    """Return 256 level RGB lookup table of a colormap.
+
+    The colormap can be given as the name of a built in colormap ("gray"
+    or "hot") or, if matplotlib is installed, of a matplotlib colormap; as
+    a callable mapping an array of values in the range 0-1 to RGB(A)
+    colors in the range 0-1, such as a matplotlib colormap; or as an
+    (N, 3) array of RGB colors, uint8 in the range 0-255 or float in the
+    range 0-1, which is linearly interpolated to 256 levels.
+
+    :param cmap: name, callable or (N, 3) array
+    :returns: :class:`numpy.ndarray` of shape (256, 3) and dtype uint8
+    :raises: ValueError if the colormap name is not known
+    """
+    x = np.linspace(0, 1, 256)
+    if isinstance(cmap, str):
+        if cmap in _COLORMAPS:
+            cmap = _COLORMAPS[cmap]
+        else:
+            cmap = _matplotlib_colormap(cmap)
+    if callable(cmap):
+        lut = np.asarray(cmap(x), dtype=float)[:, :3] * 255
+    else:
+        colors = np.asarray(cmap)
+        if np.issubdtype(colors.dtype, np.floating):
+            colors = colors * 255
+        positions = np.linspace(0, 1, len(colors))
+        lut = np.stack([np.interp(x, positions, colors[:, i])
+                        for i in range(3)], axis=-1)
+    return np.rint(np.clip(lut, 0, 255)).astype(np.uint8)
+
+
+def _label_value_table(values, num_labels):
+    """Return array of the value of each label, NaN for labels without one.
+
+    The background (label 0) never has a value.
+
+    :param values: dictionary mapping labels to values or sequence of
+                   values indexed by label
+    :param num_labels: number of labels, including the background
+    :returns: :class:`numpy.ndarray` of shape (num_labels,) and dtype float
+    """
+    table = np.full(num_labels, np.nan)
+    if isinstance(values, dict):
+        for label, value in values.items():
+            if 0 <= label < num_labels:
+                table[label] = value
+    else:
+        values = np.asarray(values, dtype=float)[:num_labels]
+        table[:len(values)] = values
+    table[:1] = np.nan
+    return table
+
+
+def label_palette(num_labels, seed=None):
+    """Return array with one RGB color per label.
+
+    By default the hues of consecutive labels are spread around the color
+    wheel using the golden ratio, giving the same distinct colors every
+    time. If a seed is given the colors are random instead. The color of
+    label 0 (the background) is black.
+
+    :param num_labels: number of labels, including the background
+    :param seed: seed for random colors or None
+    :returns: :class:`numpy.ndarray` of shape (num_labels, 3) and dtype uint8
+    """
+    if seed is None:
+        hue = (np.arange(num_labels) * 0.618033988749895) % 1.0
+        palette = _hsv_to_rgb(hue, saturation=0.7, value=0.95)
+    else:
+        random_state = np.random.RandomState(seed)
+        palette = random_state.randint(0, 256, size=(num_labels, 3))
+    palette = palette.astype(np.uint8)
+    palette[:1] = 0
+    return palette
+
+
+def _hsv_to_rgb(hue, saturation, value):
+    """Return (N, 3) array of RGB values in the range 0-255.
+
+    :param hue: array of hues in the range 0-1
+    :param saturation: saturation in the range 0-1
+    :param value: value in the range 0-1
+    """
+    sector = np.floor(hue * 6).astype(int) % 6
+    fraction = hue * 6 - np.floor(hue * 6)
+    v = np.full(hue.shape, value)
+    p = v * (1 - saturation)
+    q = v * (1 - fraction * saturation)
+    t = v * (1 - (1 - fraction) * saturation)
+    rgb = np.stack([np.choose(sector, [v, q, p, p, t, v]),
+                    np.choose(sector, [t, v, v, q, p, p]),
+                    np.choose(sector, [p, p, t, v, v, q])], axis=-1)
+    return np.round(rgb * 255)
+
+
+def _bounding_box(region):
+    """Return slices of the bounding box of the True values in a 2D array.
+
+    :param region: 2D boolean array
+    :returns: (row slice, column slice) tuple or None if region is empty
+    """
+    rows = np.flatnonzero(region.any(axis=1))
+    if rows.size == 0:
+        return None
+    cols = np.flatnonzero(region[rows[0]:rows[-1]+1].any(axis=0))
+    return slice(rows[0], rows[-1]+1), slice(cols[0], cols[-1]+1)
+
+
+def _check_alpha(alpha):
+    """Raise ValueError if an opacity is outside the range 0-1.
+
+    :param alpha: opacity or array of opacities
+    :raises: ValueError if alpha is outside the range 0-1
+    """
+    if np.any(np.less(alpha, 0)) or np.any(np.greater(alpha, 1)):
+        raise ValueError("alpha must be in the range 0-1")
+
+
+def _blend(pixels, color, alpha):
+    """Return color alpha blended over pixels using integer arithmetic.
+
+    The arithmetic is done in an unsigned integer type twice the width of
+    the pixels, avoiding floating point temporaries.
+
+    :param pixels: (..., 3) array of unsigned integer pixels
+    :param color: RGB tuple or array broadcastable to pixels
+    :param alpha: opacity of the color in the range 0-1, or array with one
+                  opacity per pixel
+    :returns: :class:`numpy.ndarray` with the same shape and dtype as pixels
+    :raises: ValueError if alpha is outside the range 0-1
+    """
+    _check_alpha(alpha)
+    wide = np.dtype("u{}".format(2 * pixels.dtype.itemsize))
+    weight = np.round(np.multiply(alpha, 255)).astype(wide)
+    if weight.ndim:
+        weight = weight[..., np.newaxis]
+    blended = pixels.astype(wide)
+    blended *= 255 - weight
+    blended += np.asarray(color).astype(wide) * weight
+    blended += 127
+    blended //= 255
+    return blended.astype(pixels.dtype)
+
+
+# Offsets, as fractions of the label size, tried in turn when nudging
+# labels away from labels already placed.
+_NUDGES = ((0, 0), (-0.5, 0), (0.5, 0), (0, -0.5), (0, 0.5),
+           (-1, 0), (1, 0), (0, -1), (0, 1),
+           (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def _place_boxes(corners, shapes, nudges=((0, 0),)):
+    """Return positions of boxes placed so that they do not overlap.
+
+    The boxes are placed greedily in order. Each box is tried at its
+    position moved by each of the nudges in turn and is skipped if none of
+    them fit. Boxes already placed are looked up in a grid with cells the
+    size of the largest box, so each box is only compared with the boxes
+    in the few cells it overlaps.
+
+    :param corners: (N, 2) integer array of (row, col) top left corners
+    :param shapes: (N, 2) integer array of (height, width) box shapes
+    :param nudges: sequence of (row, col) offsets as fractions of the box
+                   shape
+    :returns: tuple of (N, 2) array of top left corners of the placed boxes
+              and (N,) boolean array of which boxes were placed
+    """
+    corners = np.asarray(corners, dtype=int).reshape(-1, 2)
+    shapes = np.asarray(shapes, dtype=int).reshape(-1, 2)
+    cell_height, cell_width = np.maximum(shapes.max(axis=0, initial=1), 1)
+    grid = {}
+    placed = np.zeros(len(corners), dtype=bool)
+    result = corners.copy()
+    for i, ((row, col), (height, width)) in enumerate(
+            zip(corners.tolist(), shapes.tolist())):
+        for nudge_row, nudge_col in nudges:
+            top = row + int(round(nudge_row * height))
+            left = col + int(round(nudge_col * width))
+            bottom, right = top + height, left + width
+            cells = [(r, c)
+                     for r in range(top // cell_height,
+                                    (bottom - 1) // cell_height + 1)
+                     for c in range(left // cell_width,
+                                    (right - 1) // cell_width + 1)]
+            if any(top < b and t < bottom and left < r and l < right
+                   for cell in cells for t, l, b, r in grid.get(cell, ())):
+                continue
+            for cell in cells:
+                grid.setdefault(cell, []).append((top, left, bottom, right))
+            result[i] = top, left
+            placed[i] = True
+            break
+    return result, placed
+
+
+def _halve(im, chunk_rows=256):
+    """Return image reduced to half its size by averaging 2x2 blocks.
+
+    Images with an odd number of rows or columns are treated as if their
+    last row or column was repeated. The image is processed in chunks of
+    rows to keep the temporaries small.
+
+    :param im: (height, width, channels) uint8 array
+    :param chunk_rows: number of output rows to compute at a time
+    :returns: :class:`numpy.ndarray` of shape
+              (ceil(height / 2), ceil(width / 2), channels)
+    """
+    height, width = im.shape[:2]
+    out = np.empty(((height + 1) // 2, (width + 1) // 2) + im.shape[2:],
+                   dtype=im.dtype)
+    for start in range(0, out.shape[0], chunk_rows):
+        block = np.asarray(im[2 * start:2 * (start + chunk_rows)],
+                           dtype=np.uint16)
+        if len(block) % 2:
+            block = np.concatenate([block, block[-1:]])
+        if width % 2:
+            block = np.concatenate([block, block[:, -1:]], axis=1)
+        total = block[0::2, 0::2] + block[1::2, 0::2]
+        total += block[0::2, 1::2]
+        total += block[1::2, 1::2]
+        total += 2
+        total //= 4
+        out[start:start + len(total)] = total
+    return out
+
+
+def _block_row_sums(im, factor):
+    """Return sums of consecutive blocks of rows of an array.
+
+    :param im: array
+    :param factor: number of rows per block (int); the last block may be
+                   smaller
+    :returns: :class:`numpy.ndarray` of dtype float64 with
+              ceil(rows / factor) rows
+    """
+    height = im.shape[0]
+    full = height - height % factor
+    sums = im[:full].reshape((full // factor, factor) + im.shape[1:]).sum(
+        axis=1, dtype=np.float64)
+    if full < height:
+        last = im[full:].sum(axis=0, dtype=np.float64)
+        sums = np.concatenate([sums, last[np.newaxis]])
+    return sums
+
+
+def _block_mean(im, factor):
+    """Return image reduced by averaging blocks of factor x factor pixels.
+
+    Blocks on the bottom and right edges may be smaller and are averaged
+    over the pixels they contain.
+
+    :param im: 2D array
+    :param factor: size of the blocks (int)
+    :returns: :class:`numpy.ndarray` of shape
+              (ceil(height / factor), ceil(width / factor)) and dtype
+              float64
+    """
+    im = np.asarray(im)
+    height, width = im.shape
+    sums = _block_row_sums(_block_row_sums(im, factor).T, factor).T
+    counts = np.outer(np.diff(np.append(np.arange(0, height, factor),
+                                        height)),
+                      np.diff(np.append(np.arange(0, width, factor), width)))
+    return sums / counts
+
+
+def _scale(im, low, high):
+    """Return image with intensities from low to high scaled to 0-255.
+
+    Intensities outside the range are clipped.
+
+    :param im: 2D array
+    :param low: intensity mapped to 0
+    :param high: intensity mapped to 255
+    :returns: :class:`numpy.ndarray` of dtype float32
+    """
+    scaled = np.subtract(im, low, dtype=np.float32)
+    if high > low:
+        scaled *= 255. / (float(high) - float(low))
+    return np.clip(scaled, 0, 255, out=scaled)
+
+
+def _scale_to_uint8(im, low, high):
+    """Return image with intensities from low to high scaled to 0-255.
+
+    Intensities outside the range are clipped.
+
+    :param im: 2D array
+    :param low: intensity mapped to 0
+    :param high: intensity mapped to 255
+    :returns: :class:`numpy.ndarray` of dtype uint8
+    """
+    scaled = _scale(im, low, high)
+    return np.rint(scaled, out=scaled).astype(np.uint8)
+
+
+def _output_buffer(shape, out):
+    """Return out, or a new uint8 array if out is None.
+
+    :param shape: expected shape
+    :param out: None or preallocated uint8 array
+    :returns: :class:`numpy.ndarray`
+    :raises: ValueError if out has the wrong shape or dtype
+    """
+    if out is None:
+        return np.empty(shape, dtype=np.uint8)
+    if out.shape != shape or out.dtype != np.uint8:
+        raise ValueError(
+            "Expected uint8 array of shape {}, got {} array of shape {}"
+            .format(shape, out.dtype, out.shape))
+    return out
+
+
+class _LRUCache(object):
+    """Thread safe least recently used cache keeping hit/miss statistics."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, create):
+        """Return the value for key, calling create() to make it on a miss.
+
+        :param key: hashable key
+        :param create: callable without arguments returning the value
+        :returns: cached value
+        """
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                value = self._data.pop(key)
+                self._data[key] = value
+                return value
+            self.misses += 1
+        value = create()
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Remove all items and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Return dictionary with hits, misses, size and maxsize."""
+        return dict(hits=self.hits, misses=self.misses,
+                    size=len(self._data), maxsize=self.maxsize)
+
+
+class GlyphCache(object):
+    """Bounded cache of fonts and rendered text masks.
+
+    Fonts are keyed by (path, size) and rendered masks by
+    (text, size, antialias, path). Least recently used items are evicted
+    once a cache is full.
+
+    :param max_fonts: maximum number of fonts to keep
+    :param max_glyphs: maximum number of rendered masks to keep
+    """
+
+    def __init__(self, max_fonts=16, max_glyphs=4096):
+        self.fonts = _LRUCache(max_fonts)
+        self.glyphs = _LRUCache(max_glyphs)
+
+    def font(self, size, path=DEFAULT_FONT_PATH):
+        """Return a TrueType font.
+
+        :param size: font size
+        :param path: path to TrueType font file
+        :returns: :class:`PIL.ImageFont.FreeTypeFont`
+        """
+        def load():
+            import PIL.ImageFont
+            return PIL.ImageFont.truetype(path, size=size)
+        return self.fonts.get((path, size), load)
+
+    def glyph(self, text, size, antialias, path=DEFAULT_FONT_PATH):
+        """Return read only array with the rendered text.
+
+        The array is of type uint8 if antialias is True and of type bool
+        otherwise.
+
+        :param text: text to render
+        :param size: font size
+        :param antialias: whether or not the text should be antialiased
+        :param path: path to TrueType font file
+        :returns: 2D :class:`numpy.ndarray`
+        """
+        def create():
+            glyph = _glyph_array(self.font(size, path).getmask(text))
+            if not antialias:
+                glyph = glyph / 255. > .5
+            glyph.setflags(write=False)
+            return glyph
+        return self.glyphs.get((text, size, antialias, path), create)
+
+    def clear(self):
+        """Remove all cached fonts and glyphs and reset the statistics."""
+        self.fonts.clear()
+        self.glyphs.clear()
+
+    def info(self):
+        """Return dictionary with the statistics of the font and glyph caches.
+
+        :returns: dict with "fonts" and "glyphs" keys
+        """
+        return dict(fonts=self.fonts.info(), glyphs=self.glyphs.info())
+
+
+#: Module level cache used by :func:`jicbioimage.illustrate.Canvas.text_at`.
+GLYPH_CACHE = GlyphCache()
+
+
+def _base_image_method(name):
+    """Return method delegating to jicbioimage.core.image._BaseImage.
+
+    The Canvas class gets its png representation from
+    :class:`jicbioimage.core.image._BaseImage`, but only imports
+    :mod:`jicbioimage.core.image` when it is first needed.
+
+    :param name: name of the method
+    :returns: function
+    """
+    def method(self, *args, **kwargs):
+        import jicbioimage.core.image
+        function = jicbioimage.core.image._BaseImage.__dict__[name]
+        return function(self, *args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+class Canvas(np.ndarray):
     """Class for building up annotated images."""
 
+    __repr__ = _base_image_method("__repr__")
+    png = _base_image_method("png")
+    _repr_png_ = _base_image_method("_repr_png_")
+    write = _base_image_method("write")
+
     @staticmethod
-    def blank_canvas(width, height):
+    def blank_canvas(width, height, filename=None):
         """Return a blank canvas to annotate.
 
+        If a filename is given the canvas is backed by a memory mapped file
+        rather than held in memory. This makes it possible to annotate
+        canvases that are larger than the available memory; the drawing
+        methods only touch the part of the canvas they draw on. An existing
+        canvas file can be opened using :class:`numpy.memmap` and
+        :func:`numpy.ndarray.view`.
+
         :param width: xdim (int)
         :param height: ydim (int)
+        :param filename: path of file to back the canvas or None
         :returns: :class:`jicbioimage.illustrate.Canvas`
         """
-        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        shape = (height, width, 3)
+        if filename is None:
+            canvas = np.zeros(shape, dtype=np.uint8)
+        else:
+            canvas = np.memmap(filename, dtype=np.uint8, mode="w+",
+                               shape=shape)
         return canvas.view(Canvas)
 
-    def draw_cross(self, position, color=(255, 0, 0), radius=4):
+    def flush(self):
+        """Write any changes to a memory mapped canvas to disk."""
+        base = self
+        while base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        if base is not None:
+            base.flush()
+
+    def save(self, fpath, format=None, compress_level=1, quality=90):
+        """Write the canvas to an image file.
+
+        The image is encoded straight from the canvas buffer. By default PNG
+        files are written with a low compression level, trading file size
+        for encoding speed, and TIFF files are written uncompressed.
+
+        :param fpath: path or file object to write to
+        :param format: "PNG", "TIFF" or "JPEG"; by default inferred from the
+                       file extension
+        :param compress_level: PNG compression level from 0 (none, fastest)
+                               to 9 (smallest files)
+        :param quality: JPEG quality from 1 to 95
+        :raises: ValueError if no format is given when writing to a file
+                 object
+        """
+        if format is None:
+            if hasattr(fpath, "write"):
+                raise ValueError(
+                    "The format must be given when writing to a file object")
+            format = os.path.splitext(fpath)[1][1:]
+        format = format.upper()
+        format = dict(JPG="JPEG", TIF="TIFF").get(format, format)
+        options = dict(PNG=dict(compress_level=compress_level),
+                       TIFF=dict(compression="raw"),
+                       JPEG=dict(quality=quality)).get(format, {})
+        import PIL.Image
+        image = PIL.Image.fromarray(np.ascontiguousarray(self))
+        image.save(fpath, format=format, **options)
+
+    def save_deepzoom(self, fpath, tile_size=254, overlap=1, format="png"):
+        """Save the canvas as a Deep Zoom image pyramid.
+
+        Writes the Deep Zoom descriptor to ``fpath`` and the tiles to a
+        directory next to it named after it, e.g. ``slide.dzi`` and
+        ``slide_files/<level>/<column>_<row>.png``, as read by viewers such
+        as OpenSeadragon.
+
+        The levels are written one at a time from the full resolution
+        down, each one reduced from the previous one by averaging blocks of
+        2x2 pixels. Only two levels are held at any one time, the largest
+        of which is a quarter of the size of the canvas; the canvas itself
+        is only read, so it can be memory mapped.
+
+        :param fpath: path of the .dzi file to write
+        :param tile_size: width and height of the tiles without overlap
+        :param overlap: number of pixels each tile overlaps its neighbours
+        :param format: tile image format, "png" or "jpg"
+        """
+        height, width = self.shape[:2]
+        max_level = int(np.ceil(np.log2(max(height, width, 1))))
+        tiles_dir = os.path.splitext(fpath)[0] + "_files"
+        descriptor = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008"'
+            ' Format="{}" Overlap="{}" TileSize="{}">\n'
+            '  <Size Width="{}" Height="{}"/>\n'
+            '</Image>\n')
+        with open(fpath, "w") as fh:
+            fh.write(descriptor.format(format, overlap, tile_size, width,
+                                       height))
+
+        level_image = self
+        for level in range(max_level, -1, -1):
+            if level < max_level:
+                level_image = _halve(level_image).view(Canvas)
+            level_dir = os.path.join(tiles_dir, str(level))
+            if not os.path.isdir(level_dir):
+                os.makedirs(level_dir)
+            height, width = level_image.shape[:2]
+            for row in range(0, -(-height // tile_size)):
+                top = max(row * tile_size - overlap, 0)
+                bottom = (row + 1) * tile_size + overlap
+                for col in range(0, -(-width // tile_size)):
+                    left = max(col * tile_size - overlap, 0)
+                    right = (col + 1) * tile_size + overlap
+                    tile = level_image[top:bottom, left:right]
+                    tile.save(os.path.join(level_dir, "{}_{}.{}".format(
+                        col, row, format)))
+
+    def iter_tiles(self, tile_shape=(512, 512)):
+        """Yield the canvas as tiles.
+
+        The tiles are views of the canvas, so writing them out one at a time
+        does not require the whole canvas to be held in memory.
+
+        :param tile_shape: (height, width) of the tiles; tiles on the bottom
+                           and right edges may be smaller
+        :returns: generator of ((row, col), tile) tuples where (row, col) is
+                  the position of the top left corner of the tile
+        """
+        height, width = self.shape[:2]
+        for row in range(0, height, tile_shape[0]):
+            for col in range(0, width, tile_shape[1]):
+                tile = self[row:row+tile_shape[0], col:col+tile_shape[1]]
+                yield (row, col), tile
+
+    def draw_cross(self, position, color=(255, 0, 0), radius=4,
+                   thickness=1, style="+"):
         """Draw a cross on the canvas.
 
+        Parts of the cross outside the canvas are clipped.
+
         :param position: (row, col) tuple
         :param color: RGB tuple
         :param radius: radius of the cross (int)
+        :param thickness: thickness of the arms in pixels (int)
+        :param style: "+" for horizontal/vertical arms or "x" for
+                      diagonal arms
+        :raises: IndexError if the center of the cross is outside the canvas
+        :raises: ValueError if the style is not supported
         """
-        y, x = position
-        for xmod in np.arange(-radius, radius+1, 1):
-            xpos = x + xmod
-            if xpos < 0:
-                continue  # Negative indices will draw on the opposite side.
-            if xpos >= self.shape[1]:
-                continue  # Out of bounds.
-            self[int(y), int(xpos)] = color
-        for ymod in np.arange(-radius, radius+1, 1):
-            ypos = y + ymod
-            if ypos < 0:
-                continue  # Negative indices will draw on the opposite side.
-            if ypos >= self.shape[0]:
-                continue  # Out of bounds.
-            self[int(ypos), int(x)] = color
-
-    def draw_line(self, pos1, pos2, color=(255, 0, 0)):
+        if style not in ("+", "x"):
+            raise ValueError("Unsupported style: {}".format(style))
+        y, x = int(position[0]), int(position[1])
+        radius, thickness = int(radius), int(thickness)
+        height, width = self.shape[:2]
+        if not (0 <= y < height and 0 <= x < width):
+            raise IndexError(
+                "Cross center {} outside canvas".format(position))
+        lower = -(thickness // 2)
+        upper = lower + thickness
+        if style == "x":
+            step = np.arange(-radius, radius+1)
+            shift = np.arange(lower, upper)[:, np.newaxis]
+            rr = np.tile(y + step, 2 * thickness)
+            cc = np.concatenate([x + step + shift, x - step + shift])
+            self._write_pixels(rr, cc.ravel(), color)
+        else:
+            self[max(y+lower, 0):max(y+upper, 0),
+                 max(x-radius, 0):max(x+radius+1, 0)] = color
+            self[max(y-radius, 0):max(y+radius+1, 0),
+                 max(x+lower, 0):max(x+upper, 0)] = color
+
+    def draw_crosses(self, positions, color=(255, 0, 0), radius=4,
+                     threads=None):
+        """Draw many crosses on the canvas.
+
+        Pixels outside the canvas are ignored. Where crosses overlap the
+        later ones are drawn on top of the earlier ones.
+
+        :param positions: (N, 2) array of (row, col) positions
+        :param color: RGB tuple or (N, 3) array of RGB tuples
+        :param radius: radius of the crosses (int) or (N,) array of radii
+        :param threads: number of threads to draw with, see
+                        :func:`jicbioimage.illustrate.Canvas.draw_lines`
+        """
+        positions = np.asarray(positions).reshape(-1, 2).astype(int)
+        num_items = len(positions)
+        radii = _per_item(radius, num_items).astype(int)
+
+        def coordinates(items):
+            rr, cc, item = _cross_coordinates(positions[items], radii[items])
+            return rr, cc, _pixel_colors(color, items, item)
+
+        self._draw_batch(coordinates, num_items, threads)
+
+    def draw_line(self, pos1, pos2, color=(255, 0, 0), width=1,
+                  antialias=False):
         """Draw a line between pos1 and pos2 on the canvas.
 
+        See :func:`jicbioimage.illustrate.Canvas.draw_lines` for how wide
+        and antialiased lines are drawn.
+
         :param pos1: position 1 (row, col) tuple
         :param pos2: position 2 (row, col) tuple
         :param color: RGB tuple
+        :param width: width of the line in pixels
+        :param antialias: whether or not the line should be antialiased
         """
+        if width != 1 or antialias:
+            self.draw_lines([(pos1, pos2)], color, width, antialias)
+            return
+        import skimage.draw
         r1, c1 = tuple([int(round(i, 0)) for i in pos1])
         r2, c2 = tuple([int(round(i, 0)) for i in pos2])
         rr, cc = skimage.draw.line(r1, c1, r2, c2)
         self[rr, cc] = color
 
-    def mask_region(self, region, color=(0, 255, 0)):
+    def draw_lines(self, segments, color=(255, 0, 0), width=1,
+                   antialias=False, threads=None):
+        """Draw many lines on the canvas.
+
+        Pixels outside the canvas are ignored. Where lines overlap the
+        later ones are drawn on top of the earlier ones.
+
+        Aliased lines one pixel wide are drawn with the same pixels as
+        :func:`skimage.draw.line`. Wider lines cover the pixels whose
+        centers lie within half the width of the line, giving round end
+        caps. Antialiased lines are positioned with sub-pixel precision and
+        alpha blended onto the canvas by the fraction of each pixel they
+        cover.
+
+        The batch drawing methods can use a pool of threads by setting
+        ``threads``. The canvas is then split into as many horizontal bands
+        as there are threads and each band is drawn by its own thread. The
+        result is identical to drawing with a single thread.
+
+        :param segments: (N, 2, 2) array of ((row, col), (row, col)) pairs
+        :param color: RGB tuple or (N, 3) array of RGB tuples
+        :param width: width of the lines in pixels or (N,) array of widths
+        :param antialias: whether or not the lines should be antialiased
+        :param threads: number of threads to draw with or None
+        """
+        segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        widths = _per_item(width, len(segments)).astype(float)
+        if not antialias:
+            segments = np.round(segments)
+
+        def coordinates(items):
+            starts, ends = segments[items, 0], segments[items, 1]
+            if antialias:
+                rr, cc, item, coverage = _thick_line_coordinates(
+                    starts, ends, widths[items], antialias=True)
+                return rr, cc, _pixel_colors(color, items, item), coverage
+            thin = widths[items] == 1
+            if thin.all():
+                rr, cc, item = _line_coordinates(starts, ends)
+                return rr, cc, _pixel_colors(color, items, item)
+            thick = np.flatnonzero(~thin)
+            thin = np.flatnonzero(thin)
+            rr, cc, item = _line_coordinates(starts[thin], ends[thin])
+            thick_rr, thick_cc, thick_item, _ = _thick_line_coordinates(
+                starts[thick], ends[thick], widths[items][thick],
+                antialias=False)
+            # Merge the pixels of both kinds of lines back into item order.
+            item = np.concatenate([thin[item], thick[thick_item]])
+            order = np.argsort(item, kind="mergesort")
+            rr = np.concatenate([rr, thick_rr])[order]
+            cc = np.concatenate([cc, thick_cc])[order]
+            return rr, cc, _pixel_colors(color, items, item[order])
+
+        self._draw_batch(coordinates, len(segments), threads)
+
+    def draw_polyline(self, points, color=(255, 0, 0), width=1,
+                      antialias=False, closed=False, threads=None):
+        """Draw a line through a sequence of points on the canvas.
+
+        See :func:`jicbioimage.illustrate.Canvas.draw_lines` for how wide
+        and antialiased lines are drawn.
+
+        :param points: (N, 2) array of (row, col) positions
+        :param color: RGB tuple
+        :param width: width of the line in pixels
+        :param antialias: whether or not the line should be antialiased
+        :param closed: whether or not to join the last point to the first
+        :param threads: number of threads to draw with or None
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if closed:
+            points = np.concatenate([points, points[:1]])
+        segments = np.stack([points[:-1], points[1:]], axis=1)
+        self.draw_lines(segments, color, width, antialias, threads)
+
+    def mask_region(self, region, color=(0, 255, 0), alpha=1.0,
+                    offset=None):
         """Mask a region with a color.
 
-        :param region: :class:`jicbioimage.core.region.Region`
+        The region can be given in three ways:
+
+        - a boolean mask the size of the canvas, which is cropped to its
+          bounding box before use
+        - a cropped boolean mask with its top left corner at ``offset``
+        - a (rows, cols) tuple of coordinate arrays
+
+        Only the pixels within the bounding box of the region are
+        processed and parts of the region outside the canvas are ignored.
+
+        :param region: :class:`jicbioimage.core.region.Region`, boolean
+                       array or (rows, cols) tuple
         :param color: RGB tuple
+        :param alpha: opacity of the color in the range 0-1
+        :param offset: (row, col) position of the top left corner of a
+                       cropped mask
+        :raises: ValueError if alpha is outside the range 0-1
         """
-        self[region] = color
+        _check_alpha(alpha)
+        if isinstance(region, tuple):
+            rr, cc = [np.asarray(i, dtype=int) for i in region]
+            inside = ((rr >= 0) & (rr < self.shape[0])
+                      & (cc >= 0) & (cc < self.shape[1]))
+            region = rr[inside], cc[inside]
+            target = self
+        else:
+            region = np.asarray(region, dtype=bool)
+            if offset is None:
+                bbox = _bounding_box(region)
+                if bbox is None:
+                    return
+                region = region[bbox]
+                offset = bbox[0].start, bbox[1].start
+            clipped = self._clip(int(offset[0]), int(offset[1]),
+                                 region.shape)
+            if clipped is None:
+                return
+            target_box, region_box = clipped
+            region = region[region_box]
+            target = self[target_box]
+        if alpha < 1:
+            color = _blend(np.asarray(target[region]), color, alpha)
+        target[region] = color
+
+    def draw_outlines(self, label_image, color=(255, 255, 0), thickness=1):
+        """Draw the outlines of all regions of a label image.
+
+        The outline of a region is made up of its pixels that touch a pixel
+        with a different label. The outlines of all regions are found
+        together by comparing the label image with itself shifted by one
+        pixel, so the time taken does not depend on the number of regions.
+
+        :param label_image: 2D integer array where each region has its own
+                            label and the background is 0
+        :param color: RGB tuple or (N, 3) array of RGB colors indexed by
+                      label
+        :param thickness: thickness of the outlines in pixels (int); thicker
+                          outlines grow into the regions
+        """
+        label_image = np.asarray(label_image)
+        outlines = np.zeros(label_image.shape, dtype=bool)
+        for axis in (0, 1):
+            before = [slice(None), slice(None)]
+            after = [slice(None), slice(None)]
+            before[axis], after[axis] = slice(None, -1), slice(1, None)
+            before, after = tuple(before), tuple(after)
+            differs = label_image[before] != label_image[after]
+            outlines[before] |= differs
+            outlines[after] |= differs
+        for _ in range(thickness - 1):
+            grown = outlines.copy()
+            grown[1:] |= outlines[:-1]
+            grown[:-1] |= outlines[1:]
+            outlines = grown.copy()
+            outlines[:, 1:] |= grown[:, :-1]
+            outlines[:, :-1] |= grown[:, 1:]
+        outlines &= label_image != 0
+        color = np.asarray(color)
+        if color.ndim == 2:
+            color = color[label_image[outlines]]
+        self[outlines] = color
 
     def text_at(self, text, position, color=(255, 255, 255),
                 size=12, antialias=False, center=False):
@@ -121,51 +1172,998 @@ class Canvas(jicbioimage.core.image._BaseImage):
         :param center: whether or not the text should be centered on the
                        input coordinate
         """
-        def antialias_value(value, normalisation):
-            return int(round(value * normalisation))
-
-        def antialias_rgb(color, normalisation):
-            return tuple([antialias_value(v, normalisation) for v in color])
-
-        def set_color(xpos, ypos, color):
-            try:
-                self[ypos, xpos] = color
-            except IndexError:
-                pass
-
         y, x = position
-        font = PIL.ImageFont.truetype(DEFAULT_FONT_PATH, size=size)
-        mask = font.getmask(text)
-        width, height = mask.size
+        glyph = GLYPH_CACHE.glyph(text, size, antialias)
+        height, width = glyph.shape
         if center:
             x = x - (width // 2)
             y = y - (height // 2)
-        for ystep in range(height):
-            for xstep in range(width):
-                normalisation = mask[ystep * width + xstep] / 255.
-                if antialias:
-                    if normalisation != 0:
-                        rgb_color = antialias_rgb(color, normalisation)
-                        set_color(x + xstep, y+ystep, rgb_color)
-                else:
-                    if normalisation > .5:
-                        set_color(x + xstep, y + ystep, color)
+        self._paste_glyph(glyph, int(y), int(x), color, antialias)
+
+    def _paste_glyph(self, glyph, y, x, color, antialias):
+        """Write a glyph array with its top left corner at y, x.
+
+        Parts of the glyph that fall outside the canvas are clipped.
+
+        :param glyph: 2D array of glyph intensities (uint8) if antialias is
+                      True or 2D boolean array otherwise
+        :param y: row of the top left corner (int)
+        :param x: column of the top left corner (int)
+        :param color: RGB tuple
+        :param antialias: whether or not the glyph should be antialiased
+        """
+        clipped = self._clip(y, x, glyph.shape)
+        if clipped is None:
+            return
+        target_box, glyph_box = clipped
+        glyph = glyph[glyph_box]
+        target = self[target_box]
+        if antialias:
+            on = glyph != 0
+            normalisation = glyph[on] / 255.
+            rgb = np.round(normalisation[:, np.newaxis] * np.asarray(color))
+            target[on] = rgb
+        else:
+            target[glyph] = color
+
+    def text_at_many(self, texts, positions, color=(255, 255, 255),
+                     size=12, antialias=False, center=False, threads=None):
+        """Write many pieces of text on the canvas.
+
+        Pixels outside the canvas are ignored. Where texts overlap the
+        later ones are drawn on top of the earlier ones.
+
+        :param texts: sequence of N texts
+        :param positions: (N, 2) array of (row, col) positions
+        :param color: RGB tuple or (N, 3) array of RGB tuples
+        :param size: font size
+        :param antialias: whether or not the text should be antialiased
+        :param center: whether or not the text should be centered on the
+                       input coordinates
+        :param threads: number of threads to draw with, see
+                        :func:`jicbioimage.illustrate.Canvas.draw_lines`
+        """
+        texts = np.asarray(texts)
+        positions = np.asarray(positions).reshape(-1, 2).astype(int)
+
+        def coordinates(items):
+            return _text_coordinates(texts[items], positions[items],
+                                     _pixel_colors(color, items),
+                                     size, antialias, center)
+
+        self._draw_batch(coordinates, len(positions), threads)
+
+    def _draw_batch(self, coordinates, num_items, threads=None):
+        """Draw the pixels of many items, optionally using a pool of threads.
+
+        With threads the items are split into chunks. The pixels of each
+        chunk are computed and partitioned into horizontal bands of the
+        canvas on the pool, after which each band is drawn by its own
+        thread. Every pixel belongs to exactly one band and the pixels of a
+        band are drawn in the original order, so the result does not depend
+        on the number of threads.
+
+        :param coordinates: function taking a slice of items and returning
+                            (rows, cols, colors) of their pixels in drawing
+                            order, where colors is an RGB tuple or an array
+                            with one RGB tuple per pixel, optionally
+                            followed by an array with the coverage of each
+                            pixel, see
+                            :func:`jicbioimage.illustrate.Canvas._write_pixels`
+        :param num_items: number of items
+        :param threads: number of threads or None
+        """
+        if threads is None or threads < 2 or num_items == 0:
+            pixels = coordinates(slice(0, num_items))
+            self._write_pixels(*pixels[:3], coverage=_coverage(pixels))
+            return
+
+        edges = np.linspace(0, self.shape[0], threads + 1).astype(int)
+        chunk_size = -(-num_items // threads)
+
+        def partition(items):
+            pixels = coordinates(items)
+            rr, cc, color = pixels[:3]
+            color = np.asarray(color)
+            coverage = _coverage(pixels)
+            band = np.searchsorted(edges, rr, side="right") - 1
+            order = np.argsort(band, kind="mergesort")
+            bounds = np.searchsorted(band[order], np.arange(threads + 1))
+            parts = []
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                index = order[start:stop]
+                parts.append((
+                    rr[index], cc[index],
+                    color[index] if color.ndim == 2 else color,
+                    None if coverage is None else coverage[index]))
+            return parts
+
+        def draw_band(band):
+            rr, cc, colors, coverages = zip(
+                *[parts[band] for parts in chunk_parts])
+            color = colors[0]
+            if color.ndim == 2:
+                color = np.concatenate(colors)
+            coverage = coverages[0]
+            if coverage is not None:
+                coverage = np.concatenate(coverages)
+            self._write_pixels(np.concatenate(rr), np.concatenate(cc), color,
+                               coverage=coverage)
+
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(threads)
+        try:
+            chunk_parts = pool.map(
+                partition, [slice(i, i + chunk_size)
+                            for i in range(0, num_items, chunk_size)])
+            pool.map(draw_band, range(threads))
+        finally:
+            pool.close()
+
+    def _blend_pixels(self, rr, cc, color, coverage):
+        """Alpha blend colors onto pixels of the canvas in the order given.
+
+        The occurrences of the pixels are blended in rounds, the first
+        occurrence of every pixel in the first round, the second in the
+        second round and so on, so that each round gathers and writes every
+        pixel at most once.
+
+        :param rr: array of rows inside the canvas
+        :param cc: array of columns inside the canvas
+        :param color: RGB tuple or (len(rr), 3) array of RGB tuples
+        :param coverage: array of pixel coverage in the range 0-1
+        """
+        flat = rr * self.shape[1] + cc
+        order = np.argsort(flat, kind="mergesort")
+        position = np.arange(len(flat))
+        first = np.append(True, flat[order][1:] != flat[order][:-1])
+        occurrence = np.empty(len(flat), dtype=int)
+        occurrence[order] = position - np.maximum.accumulate(
+            np.where(first, position, 0))
+        order = np.argsort(occurrence, kind="mergesort")
+        bounds = np.cumsum(np.bincount(occurrence))
+        if self.flags.c_contiguous:
+            pixels = self.reshape(-1, self.shape[2])
+        else:
+            pixels = self.view(np.ndarray)
+        for start, stop in zip(np.append(0, bounds[:-1]), bounds):
+            index = order[start:stop]
+            if self.flags.c_contiguous:
+                target = flat[index]
+            else:
+                target = (rr[index], cc[index])
+            pixel_color = color[index] if color.ndim == 2 else color
+            pixels[target] = _blend(np.asarray(pixels[target]), pixel_color,
+                                    coverage[index])
+
+    def _clip(self, row, col, shape):
+        """Return slices of a box clipped to the canvas.
+
+        :param row: row of the top left corner of the box (int)
+        :param col: column of the top left corner of the box (int)
+        :param shape: (height, width) of the box
+        :returns: tuple of (row, col) slices into the canvas and into the
+                  box, or None if the box is outside the canvas
+        """
+        rmin, rmax = max(row, 0), min(row + shape[0], self.shape[0])
+        cmin, cmax = max(col, 0), min(col + shape[1], self.shape[1])
+        if rmin >= rmax or cmin >= cmax:
+            return None
+        return ((slice(rmin, rmax), slice(cmin, cmax)),
+                (slice(rmin-row, rmax-row), slice(cmin-col, cmax-col)))
+
+    def _write_pixels(self, rr, cc, color, item=None, coverage=None):
+        """Write colors to many pixels in one assignment.
+
+        Pixels outside the canvas are ignored. Pixels are painted in the
+        order given, i.e. if a pixel occurs more than once the last color
+        wins. With coverage the colors are instead alpha blended onto the
+        canvas by the coverage of each pixel, one on top of the other in
+        the order given, as if each had been drawn separately.
+
+        :param rr: array of rows
+        :param cc: array of columns
+        :param color: RGB tuple, (N, 3) array of RGB tuples indexed by item
+                      or (len(rr), 3) array of RGB tuples, one per pixel
+        :param item: array with the item index of each pixel or None
+        :param coverage: array of pixel coverage in the range 0-1 or None
+        """
+        color = np.asarray(color)
+        if item is not None and color.ndim == 2:
+            color = color[item]
+        inside = ((rr >= 0) & (rr < self.shape[0])
+                  & (cc >= 0) & (cc < self.shape[1]))
+        rr, cc = rr[inside], cc[inside]
+        if rr.size == 0:
+            return
+        if coverage is not None:
+            if color.ndim == 2:
+                color = color[inside]
+            self._blend_pixels(rr, cc, color, coverage[inside])
+            return
+        if color.ndim == 2:
+            color = color[inside]
+            flat = rr * self.shape[1] + cc
+            order = np.argsort(flat, kind="mergesort")
+            last = np.append(flat[order][1:] != flat[order][:-1], True)
+            keep = order[last]
+            rr, cc, color = rr[keep], cc[keep], color[keep]
+        if self.flags.c_contiguous:
+            # Indexing with one flat index array is much faster than
+            # indexing with row and column arrays.
+            self.reshape(-1, self.shape[2])[rr * self.shape[1] + cc] = color
+        else:
+            self[rr, cc] = color
 
 
 class AnnotatedImage(Canvas):
     """Class for building up annotated images."""
 
     @staticmethod
-    def from_grayscale(im, channels_on=(True, True, True)):
+    def from_grayscale(im, channels_on=(True, True, True), normalise=None,
+                       percentiles=(1, 99), out=None):
         """Return a canvas from a grayscale image.
 
+        By default the intensities are cast to uint8 as they are, which
+        wraps around values outside the range 0-255. Use the ``normalise``
+        option to scale other intensity ranges into 0-255:
+
+        - ``"minmax"`` scales the minimum and maximum of the image
+        - ``"percentile"`` scales the ``percentiles`` of the image,
+          clipping the intensities outside them
+        - a (low, high) tuple scales a fixed range, clipping the
+          intensities outside it
+
+        To avoid allocating a new canvas for every image a preallocated
+        (height, width, 3) uint8 array can be passed in using ``out``. The
+        returned canvas then shares its memory.
+
         :param im: single channel image
-        :channels_on: channels to populate with input image
+        :param channels_on: channels to populate with input image
+        :param normalise: None, "minmax", "percentile" or (low, high) tuple
+        :param percentiles: (low, high) percentiles used by "percentile"
+        :param out: preallocated uint8 array to write the canvas into
         :returns: :class:`jicbioimage.illustrate.Canvas`
+        :raises: ValueError if out has the wrong shape or dtype or if the
+                 normalise option is not recognised
+        """
+        im = np.asarray(im)
+        if normalise is not None:
+            if normalise == "minmax":
+                low, high = im.min(), im.max()
+            elif normalise == "percentile":
+                low, high = np.percentile(im, percentiles)
+            elif isinstance(normalise, str):
+                raise ValueError(
+                    "Unknown normalise option: {}".format(normalise))
+            else:
+                low, high = normalise
+            im = _scale_to_uint8(im, low, high)
+        out = _output_buffer(im.shape + (3,), out)
+        channels_on = np.asarray(channels_on, dtype=bool)
+        out[:, :, channels_on] = im[:, :, np.newaxis]
+        out[:, :, ~channels_on] = 0
+        return out.view(AnnotatedImage)
+
+    @staticmethod
+    def from_channels(images, colors, ranges=None, chunk_rows=256, out=None):
+        """Return a canvas composited from several single channel images.
+
+        Each image is scaled from its (low, high) range to 0-255, colored
+        and added to the composite. Sums above 255 saturate. The images are
+        processed in chunks of rows so that the temporary memory needed does
+        not depend on the size of the images.
+
+        :param images: sequence of single channel images of the same shape
+        :param colors: sequence of RGB tuples, one per image
+        :param ranges: sequence of (low, high) tuples, one per image; None
+                       (for all images or a particular image) uses the
+                       minimum and maximum of the image
+        :param chunk_rows: number of rows to process at a time
+        :param out: preallocated uint8 array to write the canvas into
+        :returns: :class:`jicbioimage.illustrate.AnnotatedImage`
+        :raises: ValueError if the number of images, colors and ranges
+                 differ or if out has the wrong shape or dtype
+        """
+        images = [np.asarray(im) for im in images]
+        if ranges is None:
+            ranges = [None] * len(images)
+        if not len(images) == len(colors) == len(ranges):
+            raise ValueError(
+                "Got {} images, {} colors and {} ranges".format(
+                    len(images), len(colors), len(ranges)))
+        ranges = [(im.min(), im.max()) if r is None else r
+                  for im, r in zip(images, ranges)]
+        colors = np.asarray(colors, dtype=np.float32) / 255.
+        out = _output_buffer(images[0].shape + (3,), out)
+        for start in range(0, out.shape[0], chunk_rows):
+            rows = slice(start, start + chunk_rows)
+            composite = np.zeros(out[rows].shape, dtype=np.float32)
+            for im, (low, high), color in zip(images, ranges, colors):
+                scaled = _scale(im[rows], low, high)
+                composite += scaled[:, :, np.newaxis] * color
+            np.clip(composite, 0, 255, out=composite)
+            out[rows] = np.rint(composite)
+        return out.view(AnnotatedImage)
+
+    @staticmethod
+    def thumbnail(im, display_list=None, size=256,
+                  channels_on=(True, True, True), normalise=None,
+                  layers=None):
+        """Return a small annotated version of a grayscale image.
+
+        Rather than annotating the image at full resolution and shrinking
+        the result, the image is reduced first, by averaging blocks of
+        pixels, and the annotations are then drawn on the reduced image
+        with their positions, radii, line widths, font sizes and regions
+        scaled to match. The cost of drawing therefore depends on the size
+        of the thumbnail rather than of the image, and the annotations
+        remain legible.
+
+        :param im: single channel image
+        :param display_list: :class:`jicbioimage.illustrate.DisplayList` of
+                             annotations in the coordinates of the image
+        :param size: maximum width and height of the thumbnail in pixels
+        :param channels_on: channels to populate with input image
+        :param normalise: intensity normalisation of the reduced image, see
+                          :func:`AnnotatedImage.from_grayscale`
+        :param layers: names of the layers to draw, defaults to all layers
+        :returns: :class:`jicbioimage.illustrate.AnnotatedImage`
+        """
+        im = np.asarray(im)
+        factor = max(-(-max(im.shape) // size), 1)
+        if factor > 1:
+            reduced = _block_mean(im, factor)
+            if np.issubdtype(im.dtype, np.integer):
+                reduced = np.rint(reduced)
+            im = reduced.astype(im.dtype)
+        canvas = AnnotatedImage.from_grayscale(im, channels_on,
+                                               normalise=normalise)
+        if display_list is not None:
+            display_list.render(canvas, scale=1. / factor, layers=layers)
+        return canvas
+
+    def overlay_labels(self, label_image, palette=None, alpha=1.0,
+                       skip_background=True):
+        """Color all regions of a label image in one pass.
+
+        :param label_image: 2D integer array where each region has its own
+                            label and the background is 0
+        :param palette: (N, 3) array of RGB colors indexed by label, defaults
+                        to :func:`jicbioimage.illustrate.label_palette`
+        :param alpha: opacity of the colors in the range 0-1
+        :param skip_background: whether or not to leave the background
+                                (label 0) untouched
+        :raises: ValueError if alpha is outside the range 0-1
+        """
+        _check_alpha(alpha)
+        label_image = np.asarray(label_image)
+        if palette is None:
+            palette = label_palette(int(label_image.max()) + 1)
+        palette = np.asarray(palette)
+        if alpha < 1:
+            # Only gather and blend the pixels that are being colored.
+            index = Ellipsis
+            if skip_background:
+                index = np.nonzero(label_image)
+            colors = palette[label_image[index]]
+            self[index] = _blend(np.asarray(self[index]), colors, alpha)
+            return
+        where = True
+        if skip_background:
+            where = (label_image != 0)[:, :, np.newaxis]
+        np.copyto(self, palette[label_image], where=where, casting="unsafe")
+
+    def overlay_scalar(self, field, cmap="hot", vmin=None, vmax=None,
+                       alpha=1.0, chunk_rows=256):
+        """Color the canvas by a scalar field, such as a probability map.
+
+        The field is quantized to 256 levels from vmin to vmax, values
+        outside the range are clipped, and colored with a lookup table
+        of the colormap. NaN values are left untouched. The field is
+        processed in chunks of rows so that the temporary memory needed
+        does not depend on the size of the image.
+
+        :param field: 2D array the size of the canvas
+        :param cmap: colormap, see :func:`jicbioimage.illustrate.colormap_lut`
+        :param vmin: value mapped to the first color, defaults to the
+                     minimum of the field
+        :param vmax: value mapped to the last color, defaults to the
+                     maximum of the field
+        :param alpha: opacity of the colors in the range 0-1
+        :param chunk_rows: number of rows to process at a time
+        :raises: ValueError if alpha is outside the range 0-1
+        """
+        _check_alpha(alpha)
+        field = np.asarray(field)
+        lut = colormap_lut(cmap)
+        if vmin is None:
+            vmin = np.nanmin(field)
+        if vmax is None:
+            vmax = np.nanmax(field)
+        for start in range(0, field.shape[0], chunk_rows):
+            rows = slice(start, start + chunk_rows)
+            levels = _scale(field[rows], vmin, vmax)
+            missing = np.isnan(levels)
+            levels[missing] = 0
+            levels = np.rint(levels, out=levels).astype(np.uint8)
+            colors = lut.take(levels, axis=0)
+            target = self[rows]
+            if alpha < 1:
+                colors = _blend(np.asarray(target), colors, alpha)
+            if missing.any():
+                np.copyto(target, colors, where=~missing[:, :, np.newaxis])
+            else:
+                target[...] = colors
+
+    def colour_regions_by_value(self, label_image, values, cmap="hot",
+                                vmin=None, vmax=None, alpha=1.0):
+        """Color each region by a value, such as its area or intensity.
+
+        The values are quantized to 256 levels from vmin to vmax, values
+        outside the range are clipped, and looked up in the colormap to
+        give a table with one color per label. The whole image is then
+        colored with a single lookup into the table, however many regions
+        there are. The background (label 0) and regions without a value,
+        or with a NaN value, are left untouched.
+
+        :param label_image: 2D integer array where each region has its own
+                            label and the background is 0
+        :param values: dictionary mapping labels to values or sequence of
+                       values indexed by label
+        :param cmap: colormap, see :func:`jicbioimage.illustrate.colormap_lut`
+        :param vmin: value mapped to the first color, defaults to the
+                     minimum of the values
+        :param vmax: value mapped to the last color, defaults to the
+                     maximum of the values
+        :param alpha: opacity of the colors in the range 0-1
+        :raises: ValueError if alpha is outside the range 0-1
+        """
+        _check_alpha(alpha)
+        label_image = np.asarray(label_image)
+        table = _label_value_table(values, int(label_image.max()) + 1)
+        missing = np.isnan(table)
+        if missing.all():
+            return
+        if vmin is None:
+            vmin = np.nanmin(table)
+        if vmax is None:
+            vmax = np.nanmax(table)
+        levels = _scale(table, vmin, vmax)
+        levels[missing] = 0
+        levels = np.rint(levels, out=levels).astype(np.uint8)
+        palette = colormap_lut(cmap).take(levels, axis=0)
+        colored = ~missing[label_image]
+        if alpha < 1:
+            index = np.nonzero(colored)
+            colors = palette[label_image[index]]
+            self[index] = _blend(np.asarray(self[index]), colors, alpha)
+            return
+        np.copyto(self, palette[label_image], where=colored[:, :, np.newaxis])
+
+    def label_regions(self, label_image, fmt="{label}",
+                      color=(255, 255, 255), size=12, antialias=False,
+                      overlap="skip"):
+        """Write the label of each region at its centroid.
+
+        The centroids of all regions are computed in one pass over the
+        label image. Where labels would overlap those of larger regions are
+        written first, and the others are skipped, or with
+        ``overlap="nudge"`` moved a little way to a free spot if there is
+        one.
+
+        :param label_image: 2D integer array where each region has its own
+                            label and the background is 0
+        :param fmt: format string used to create the text of each region
+                    from its ``label``
+        :param color: RGB tuple or (N, 3) array of RGB colors indexed by
+                      label
+        :param size: font size
+        :param antialias: whether or not the text should be antialiased
+        :param overlap: "skip", "nudge" or "allow" overlapping labels
+        :returns: :class:`numpy.ndarray` of the labels written
+        """
+        if overlap not in ("skip", "nudge", "allow"):
+            raise ValueError("Unsupported overlap: {}".format(overlap))
+        label_image = np.asarray(label_image)
+        height, width = label_image.shape
+        flat = label_image.ravel()
+        areas = np.bincount(flat)
+        rows = np.bincount(flat, weights=np.repeat(np.arange(height), width))
+        cols = np.bincount(flat, weights=np.tile(np.arange(width), height))
+        labels = np.flatnonzero(areas[1:]) + 1
+        labels = labels[np.argsort(-areas[labels], kind="mergesort")]
+        centroids = np.stack([rows[labels], cols[labels]], axis=-1)
+        centroids = centroids / areas[labels, np.newaxis]
+
+        texts = [fmt.format(label=label) for label in labels]
+        shapes = np.array([GLYPH_CACHE.glyph(text, size, antialias).shape
+                           for text in texts], dtype=int).reshape(-1, 2)
+        corners = centroids.astype(int) - shapes // 2
+        if overlap != "allow":
+            nudges = _NUDGES if overlap == "nudge" else ((0, 0),)
+            corners, placed = _place_boxes(corners, shapes, nudges)
+            labels, corners = labels[placed], corners[placed]
+            texts = [text for text, keep in zip(texts, placed) if keep]
+
+        color = np.asarray(color)
+        if color.ndim == 2:
+            color = color[labels]
+        self.text_at_many(texts, corners, color, size=size,
+                          antialias=antialias)
+        return labels
+
+
+class _ArrayBuffer(object):
+    """Growable array with amortised constant time appends."""
+
+    def __init__(self, shape, dtype):
+        self._shape = tuple(shape)
+        self._dtype = dtype
+        self._data = np.empty((16,) + self._shape, dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def array(self):
+        """Return view of the values in the buffer."""
+        return self._data[:self._size]
+
+    def extend(self, values):
+        """Append values to the buffer.
+
+        :param values: array-like reshapeable to (N,) + shape
+        """
+        values = np.asarray(values, dtype=self._dtype)
+        values = values.reshape((-1,) + self._shape)
+        size = self._size + len(values)
+        if size > len(self._data):
+            data = np.empty((max(size, 2 * len(self._data)),) + self._shape,
+                            dtype=self._dtype)
+            data[:self._size] = self.array
+            self._data = data
+        self._data[self._size:size] = values
+        self._size = size
+
+
+def _resample_region(mask, offset, scale):
+    """Return coordinates of a cropped mask scaled by a factor.
+
+    Uses nearest neighbour sampling.
+
+    :param mask: cropped 2D boolean array
+    :param offset: (row, col) position of the top left corner of the mask
+    :param scale: scale factor
+    :returns: (rows, cols) tuple of coordinate arrays
+    """
+    if scale == 1:
+        rr, cc = np.nonzero(mask)
+        return rr + offset[0], cc + offset[1]
+    index = []
+    for start, length in zip(offset, mask.shape):
+        target = np.arange(int(np.floor(start * scale)),
+                           int(np.ceil((start + length) * scale)))
+        source = np.floor((target + 0.5) / scale).astype(int) - start
+        valid = (source >= 0) & (source < length)
+        index.append((target[valid], source[valid]))
+    (rows, src_rows), (cols, src_cols) = index
+    rr, cc = np.nonzero(mask[np.ix_(src_rows, src_cols)])
+    return rows[rr], cols[cc]
+
+
+def _resample_coordinates(rr, cc, scale):
+    """Return pixel coordinates scaled by a factor.
+
+    Uses the same nearest neighbour sampling as :func:`_resample_region`,
+    i.e. every source pixel becomes the block of target pixels whose
+    centers fall inside it.
+
+    :param rr: array of rows
+    :param cc: array of columns
+    :param scale: scale factor
+    :returns: (rows, cols) tuple of coordinate arrays
+    """
+    if scale == 1:
+        return rr, cc
+    first_row, first_col = [np.ceil(i * scale - 0.5).astype(int)
+                            for i in (rr, cc)]
+    num_rows, num_cols = [np.ceil((i + 1) * scale - 0.5).astype(int) - first
+                          for i, first in ((rr, first_row),
+                                           (cc, first_col))]
+    position, item = _ragged_arange(num_rows * num_cols)
+    row, col = np.divmod(position, num_cols[item])
+    return first_row[item] + row, first_col[item] + col
+
+
+class DisplayList(object):
+    """Record annotations and draw them onto a canvas on demand.
+
+    The recording methods mirror those of
+    :class:`jicbioimage.illustrate.Canvas`, but only store the annotations in
+    compact arrays. Calling :func:`render` draws all annotations of each
+    kind in one batch. The same annotations can be rendered again onto a
+    new canvas, at a different scale, or with some layers left out, without
+    having to re-run the analysis that produced them.
+
+    >>> display_list = DisplayList()
+    >>> display_list.draw_cross((10, 20), layer="nuclei")
+    >>> display_list.text_at("1", (12, 22), layer="labels")
+    >>> canvas = display_list.render(Canvas.blank_canvas(50, 50),
+    ...                              layers=["nuclei"])
+
+    Regions are drawn first, followed by lines, crosses and text. Within
+    each kind annotations are drawn in the order they were recorded, except
+    that antialiased lines are drawn after aliased ones.
+
+    Regions are stored as masks cropped to their bounding boxes or, when
+    that would take more memory, as arrays of pixel coordinates.
+    """
+
+    def __init__(self):
+        self._layers = []
+        self._crosses = dict(position=_ArrayBuffer((2,), float),
+                             color=_ArrayBuffer((3,), np.uint16),
+                             radius=_ArrayBuffer((), np.int32),
+                             layer=_ArrayBuffer((), np.int32))
+        self._lines = dict(segment=_ArrayBuffer((2, 2), float),
+                           color=_ArrayBuffer((3,), np.uint16),
+                           width=_ArrayBuffer((), np.float32),
+                           antialias=_ArrayBuffer((), bool),
+                           layer=_ArrayBuffer((), np.int32))
+        self._texts = dict(position=_ArrayBuffer((2,), float),
+                           color=_ArrayBuffer((3,), np.uint16),
+                           size=_ArrayBuffer((), np.int32),
+                           antialias=_ArrayBuffer((), bool),
+                           center=_ArrayBuffer((), bool),
+                           layer=_ArrayBuffer((), np.int32))
+        self._text_strings = []
+        self._regions = dict(offset=_ArrayBuffer((2,), np.int64),
+                             shape=_ArrayBuffer((2,), np.int64),
+                             sparse=_ArrayBuffer((), bool),
+                             start=_ArrayBuffer((), np.int64),
+                             length=_ArrayBuffer((), np.int64),
+                             color=_ArrayBuffer((3,), np.uint16),
+                             alpha=_ArrayBuffer((), np.float32),
+                             layer=_ArrayBuffer((), np.int32))
+        self._region_bits = _ArrayBuffer((), bool)
+        self._region_coordinates = _ArrayBuffer((2,), np.int64)
+
+    def __len__(self):
+        return sum(len(kind["layer"]) for kind in self._kinds())
+
+    @property
+    def layers(self):
+        """Return list of layer names in the order they were first used."""
+        return list(self._layers)
+
+    def _kinds(self):
+        return self._regions, self._lines, self._crosses, self._texts
+
+    def _layer_index(self, layer):
+        if layer not in self._layers:
+            self._layers.append(layer)
+        return self._layers.index(layer)
+
+    def _record(self, kind, num_items, layer, **values):
+        for key, value in values.items():
+            if np.ndim(value) <= kind[key].array.ndim - 1:
+                value = np.broadcast_to(value,
+                                        (num_items,) + np.shape(value))
+            kind[key].extend(value)
+        kind["layer"].extend(np.full(num_items, self._layer_index(layer)))
+
+    def draw_cross(self, position, color=(255, 0, 0), radius=4,
+                   layer="default"):
+        """Record a cross.
+
+        :param position: (row, col) tuple
+        :param color: RGB tuple
+        :param radius: radius of the cross (int)
+        :param layer: name of the layer
+        """
+        self.draw_crosses([position], color, radius, layer)
+
+    def draw_crosses(self, positions, color=(255, 0, 0), radius=4,
+                     layer="default"):
+        """Record many crosses.
+
+        :param positions: (N, 2) array of (row, col) positions
+        :param color: RGB tuple or (N, 3) array of RGB tuples
+        :param radius: radius of the crosses (int) or (N,) array of radii
+        :param layer: name of the layer
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        num_items = len(positions)
+        self._record(self._crosses, num_items, layer, position=positions,
+                     color=_per_item_colors(color, num_items),
+                     radius=_per_item(radius, num_items))
+
+    def draw_line(self, pos1, pos2, color=(255, 0, 0), width=1,
+                  antialias=False, layer="default"):
+        """Record a line between pos1 and pos2.
+
+        :param pos1: position 1 (row, col) tuple
+        :param pos2: position 2 (row, col) tuple
+        :param color: RGB tuple
+        :param width: width of the line in pixels
+        :param antialias: whether or not the line should be antialiased
+        :param layer: name of the layer
+        """
+        self.draw_lines([(pos1, pos2)], color, width, antialias, layer)
+
+    def draw_lines(self, segments, color=(255, 0, 0), width=1,
+                   antialias=False, layer="default"):
+        """Record many lines.
+
+        :param segments: (N, 2, 2) array of ((row, col), (row, col)) pairs
+        :param color: RGB tuple or (N, 3) array of RGB tuples
+        :param width: width of the lines in pixels or (N,) array of widths
+        :param antialias: whether or not the lines should be antialiased
+        :param layer: name of the layer
         """
-        xdim, ydim = im.shape
-        canvas = np.zeros((xdim, ydim, 3), dtype=np.uint8)
-        for i, include in enumerate(channels_on):
-            if include:
-                canvas[:, :, i] = im
-        return canvas.view(AnnotatedImage)
+        segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        num_items = len(segments)
+        self._record(self._lines, num_items, layer, segment=segments,
+                     color=_per_item_colors(color, num_items),
+                     width=_per_item(width, num_items), antialias=antialias)
+
+    def draw_polyline(self, points, color=(255, 0, 0), width=1,
+                      antialias=False, closed=False, layer="default"):
+        """Record a line through a sequence of points.
+
+        :param points: (N, 2) array of (row, col) positions
+        :param color: RGB tuple
+        :param width: width of the line in pixels
+        :param antialias: whether or not the line should be antialiased
+        :param closed: whether or not to join the last point to the first
+        :param layer: name of the layer
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if closed:
+            points = np.concatenate([points, points[:1]])
+        self.draw_lines(np.stack([points[:-1], points[1:]], axis=1), color,
+                        width, antialias, layer)
+
+    def mask_region(self, region, color=(0, 255, 0), alpha=1.0, offset=None,
+                    layer="default"):
+        """Record a region.
+
+        The region is stored as a mask cropped to its bounding box, or as
+        the coordinates of its pixels if they take less memory.
+
+        :param region: boolean array or (rows, cols) tuple, see
+                       :func:`jicbioimage.illustrate.Canvas.mask_region`
+        :param color: RGB tuple
+        :param alpha: opacity of the color in the range 0-1
+        :param offset: (row, col) position of the top left corner of a
+                       cropped mask
+        :param layer: name of the layer
+        :raises: ValueError if alpha is outside the range 0-1
+        """
+        _check_alpha(alpha)
+        if isinstance(region, tuple):
+            rr, cc = [np.asarray(i, dtype=int).ravel() for i in region]
+            if rr.size == 0:
+                return
+            offset = rr.min(), cc.min()
+            shape = rr.max() - offset[0] + 1, cc.max() - offset[1] + 1
+            mask = None
+        else:
+            mask = np.asarray(region, dtype=bool)
+            if offset is None:
+                bbox = _bounding_box(mask)
+                if bbox is None:
+                    return
+                mask = mask[bbox]
+                offset = bbox[0].start, bbox[1].start
+            shape = mask.shape
+            rr = cc = None
+        # A mask takes one byte per pixel of the bounding box and the
+        # coordinates sixteen bytes per pixel of the region.
+        num_pixels = rr.size if mask is None else np.count_nonzero(mask)
+        sparse = 16 * num_pixels < shape[0] * shape[1]
+        if sparse:
+            if mask is not None:
+                rr, cc = np.nonzero(mask)
+                rr, cc = rr + offset[0], cc + offset[1]
+            values = np.stack([rr, cc], axis=-1)
+            buf = self._region_coordinates
+        else:
+            if mask is None:
+                mask = np.zeros(shape, dtype=bool)
+                mask[rr - offset[0], cc - offset[1]] = True
+            values = mask.ravel()
+            buf = self._region_bits
+        self._record(self._regions, 1, layer, offset=offset, shape=shape,
+                     sparse=sparse, start=len(buf), length=len(values),
+                     color=color, alpha=alpha)
+        buf.extend(values)
+
+    def text_at(self, text, position, color=(255, 255, 255), size=12,
+                antialias=False, center=False, layer="default"):
+        """Record text.
+
+        :param text: text to write
+        :param position: (row, col) tuple
+        :param color: RGB tuple
+        :param size: font size
+        :param antialias: whether or not the text should be antialiased
+        :param center: whether or not the text should be centered on the
+                       input coordinate
+        :param layer: name of the layer
+        """
+        self.text_at_many([text], [position], color, size, antialias, center,
+                          layer)
+
+    def text_at_many(self, texts, positions, color=(255, 255, 255), size=12,
+                     antialias=False, center=False, layer="default"):
+        """Record many pieces of text.
+
+        :param texts: sequence of N texts
+        :param positions: (N, 2) array of (row, col) positions
+        :param color: RGB tuple or (N, 3) array of RGB tuples
+        :param size: font size
+        :param antialias: whether or not the text should be antialiased
+        :param center: whether or not the text should be centered on the
+                       input coordinates
+        :param layer: name of the layer
+        :raises: ValueError if the numbers of texts and positions differ
+        """
+        texts = [str(text) for text in texts]
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        num_items = len(positions)
+        if len(texts) != num_items:
+            raise ValueError(
+                "Got {} texts but {} positions".format(len(texts),
+                                                       num_items))
+        self._text_strings.extend(texts)
+        self._record(self._texts, num_items, layer, position=positions,
+                     color=_per_item_colors(color, num_items), size=size,
+                     antialias=antialias, center=center)
+
+    def _buffers(self):
+        """Return dictionary of all buffers keyed by a unique name."""
+        buffers = dict(region_bits=self._region_bits,
+                       region_coordinates=self._region_coordinates)
+        for name, kind in [("regions", self._regions), ("lines", self._lines),
+                           ("crosses", self._crosses), ("texts", self._texts)]:
+            for key, buf in kind.items():
+                buffers["{}_{}".format(name, key)] = buf
+        return buffers
+
+    def save(self, fpath):
+        """Save the display list to a numpy .npz file.
+
+        Layer names are stored as strings.
+
+        :param fpath: path to output file
+        """
+        arrays = dict((name, buf.array)
+                      for name, buf in self._buffers().items())
+        np.savez_compressed(fpath,
+                            layers=np.array(self._layers, dtype=str),
+                            text_strings=np.array(self._text_strings,
+                                                  dtype=str),
+                            **arrays)
+
+    @staticmethod
+    def load(fpath):
+        """Return a display list loaded from a numpy .npz file.
+
+        :param fpath: path to file written by
+                      :func:`jicbioimage.illustrate.DisplayList.save`
+        :returns: :class:`jicbioimage.illustrate.DisplayList`
+        """
+        display_list = DisplayList()
+        with np.load(fpath) as data:
+            display_list._layers = [str(name) for name in data["layers"]]
+            display_list._text_strings = [
+                str(text) for text in data["text_strings"]]
+            for name, buf in display_list._buffers().items():
+                buf.extend(data[name])
+        return display_list
+
+    def set_color(self, layer, color):
+        """Change the color of all annotations in a layer.
+
+        :param layer: name of the layer
+        :param color: RGB tuple
+        """
+        if layer not in self._layers:
+            return
+        index = self._layers.index(layer)
+        for kind in self._kinds():
+            kind["color"].array[kind["layer"].array == index] = color
+
+    def render(self, canvas, scale=1.0, layers=None, threads=None):
+        """Draw the recorded annotations onto a canvas.
+
+        :param canvas: :class:`jicbioimage.illustrate.Canvas` to draw on
+        :param scale: factor to scale positions, radii, line widths, font
+                      sizes and regions by; line widths and font sizes are
+                      kept at least 1
+        :param layers: names of the layers to draw, defaults to all layers
+        :param threads: number of threads to draw lines, crosses and text
+                        with, see
+                        :func:`jicbioimage.illustrate.Canvas.draw_lines`
+        :returns: the canvas
+        """
+        if layers is None:
+            layers = self._layers
+        visible = np.array([name in layers for name in self._layers],
+                           dtype=bool)
+
+        def selected(kind):
+            return visible[kind["layer"].array]
+
+        regions = self._regions
+        colors = regions["color"].array
+        bits = self._region_bits.array
+        coordinates = self._region_coordinates.array
+        opaque = []
+
+        def draw_opaque():
+            # Draw the opaque regions recorded so far in one go.
+            if opaque:
+                rr, cc, item = [np.concatenate(i) for i in zip(*opaque)]
+                canvas._write_pixels(rr, cc, colors, item)
+                del opaque[:]
+
+        for i in np.flatnonzero(selected(regions)):
+            start = regions["start"].array[i]
+            stop = start + regions["length"].array[i]
+            if regions["sparse"].array[i]:
+                rr, cc = _resample_coordinates(
+                    *coordinates[start:stop].T, scale=scale)
+            else:
+                shape = tuple(regions["shape"].array[i])
+                mask = bits[start:stop].reshape(shape)
+                rr, cc = _resample_region(mask, regions["offset"].array[i],
+                                          scale)
+            alpha = regions["alpha"].array[i]
+            if alpha < 1:
+                draw_opaque()
+                canvas.mask_region((rr, cc), colors[i], alpha)
+            else:
+                opaque.append((rr, cc, np.full(rr.size, i)))
+        draw_opaque()
+
+        lines = self._lines
+        for antialias in (False, True):
+            group = selected(lines) & (lines["antialias"].array == antialias)
+            widths = np.maximum(lines["width"].array[group] * scale, 1)
+            canvas.draw_lines(lines["segment"].array[group] * scale,
+                              lines["color"].array[group], widths, antialias,
+                              threads)
+
+        crosses = selected(self._crosses)
+        radii = np.round(self._crosses["radius"].array[crosses] * scale)
+        canvas.draw_crosses(self._crosses["position"].array[crosses] * scale,
+                            self._crosses["color"].array[crosses], radii,
+                            threads)
+
+        # Draw each run of consecutive texts of the same style in one go, so
+        # that the texts are drawn in the order they were recorded.
+        texts = self._texts
+        styles = np.stack([texts["size"].array, texts["antialias"].array,
+                           texts["center"].array], axis=-1)
+        strings = np.array(self._text_strings, dtype=object)
+        index = np.flatnonzero(selected(texts))
+        changes = np.any(styles[index][1:] != styles[index][:-1], axis=1)
+        for group in np.split(index, np.flatnonzero(changes) + 1):
+            if group.size == 0:
+                continue
+            size, antialias, center = styles[group[0]]
+            canvas.text_at_many(strings[group],
+                                texts["position"].array[group] * scale,
+                                texts["color"].array[group],
+                                size=max(int(round(size * scale)), 1),
+                                antialias=bool(antialias),
+                                center=bool(center), threads=threads)
+        return canvas
+
+
+if os.environ.get("JICBIOIMAGE_ILLUSTRATE_PROFILE"):
+    importlib.import_module("jicbioimage.illustrate.profiling")
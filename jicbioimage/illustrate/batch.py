@@ -0,0 +1,194 @@
+"""Module for illustrating large collections of images.
+
+The :func:`jicbioimage.illustrate.batch.illustrate_batch` function renders
+(image, annotations) jobs on a pool of processes and writes the resulting
+PNG files to disk in the order of the jobs. The annotations of a job are
+given as a :class:`jicbioimage.illustrate.DisplayList`.
+
+>>> from jicbioimage.illustrate import DisplayList
+>>> from jicbioimage.illustrate.batch import illustrate_batch
+>>> def jobs(images, centroids):
+...     for im, points in zip(images, centroids):
+...         display_list = DisplayList()
+...         display_list.draw_crosses(points)
+...         yield im, display_list
+>>> illustrate_batch(jobs(images, centroids),
+...                  "annotated_{:05d}.png")  # doctest: +SKIP
+
+Images and display lists can also be given as paths to files, in which case
+they are read by the worker processes. This is what the
+``jicbioimage-illustrate`` command line tool does.
+"""
+
+import argparse
+import io
+import multiprocessing
+import os.path
+import sys
+from collections import deque
+from functools import partial
+
+import numpy as np
+
+from jicbioimage.illustrate import AnnotatedImage, DisplayList, GLYPH_CACHE
+
+
+def _warm_glyph_cache(texts, font_sizes):
+    """Load fonts and render texts into the glyph cache of a worker.
+
+    :param texts: texts to render
+    :param font_sizes: font sizes to load
+    """
+    for size in font_sizes:
+        GLYPH_CACHE.font(size)
+        for text in texts:
+            GLYPH_CACHE.glyph(text, size, antialias=False)
+
+
+def _illustrate(job, normalise=None, compress_level=1):
+    """Return PNG encoded annotated image.
+
+    :param job: (image, display list) tuple where either can be a path to
+                a file
+    :param normalise: intensity normalisation of the images, see
+                      :func:`AnnotatedImage.from_grayscale`
+    :param compress_level: PNG compression level
+    :returns: PNG as bytes
+    """
+    image, display_list = job
+    if isinstance(image, str):
+        import PIL.Image
+        image = np.asarray(PIL.Image.open(image))
+    if isinstance(display_list, str):
+        display_list = DisplayList.load(display_list)
+    canvas = AnnotatedImage.from_grayscale(image, normalise=normalise)
+    display_list.render(canvas)
+    output = io.BytesIO()
+    canvas.save(output, format="PNG", compress_level=compress_level)
+    return output.getvalue()
+
+
+def _format_output_path(fmt):
+    """Return function formatting a string with the index of a job.
+
+    :param fmt: format string, e.g. "frame_{:05d}.png"
+    :returns: function taking the index and the job and returning the
+              output path
+    """
+    def output_path(index, job):
+        return fmt.format(index)
+    return output_path
+
+
+def illustrate_batch(jobs, outputs, processes=None, max_in_flight=None,
+                     normalise=None, warm_texts=(), font_sizes=(12,),
+                     compress_level=1):
+    """Render annotated images on a pool of processes and write them to disk.
+
+    Jobs are read from the iterable lazily, so that at most
+    ``max_in_flight`` jobs are held in memory at any one time, and the PNG
+    files are written in the order of the jobs.
+
+    :param jobs: iterable of (image, display list) tuples where the image is
+                 a grayscale array or path to an image file and the display
+                 list is a :class:`jicbioimage.illustrate.DisplayList` or path
+                 to a file written by
+                 :func:`jicbioimage.illustrate.DisplayList.save`
+    :param outputs: format string, e.g. "frame_{:05d}.png", formatted with
+                    the index of each job, or function taking the index and
+                    the job and returning the output path
+    :param processes: number of worker processes, defaults to the number of
+                      CPUs
+    :param max_in_flight: maximum number of jobs submitted but not yet
+                          written, defaults to twice the number of processes
+    :param normalise: intensity normalisation of the images, see
+                      :func:`AnnotatedImage.from_grayscale`
+    :param warm_texts: texts to render into the glyph cache of each worker
+                       when it starts
+    :param font_sizes: font sizes to load in each worker when it starts
+    :param compress_level: PNG compression level from 0 (none, fastest) to
+                           9 (smallest files)
+    :returns: list of paths written
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if max_in_flight is None:
+        max_in_flight = 2 * processes
+    output_path = outputs
+    if isinstance(outputs, str):
+        output_path = _format_output_path(outputs)
+    worker = partial(_illustrate, normalise=normalise,
+                     compress_level=compress_level)
+    pool = multiprocessing.Pool(processes, initializer=_warm_glyph_cache,
+                                initargs=(tuple(warm_texts),
+                                          tuple(font_sizes)))
+    written = []
+    pending = deque()
+
+    def write_next():
+        fpath, result = pending.popleft()
+        with open(fpath, "wb") as fh:
+            fh.write(result.get())
+        written.append(fpath)
+
+    try:
+        for index, job in enumerate(jobs):
+            if len(pending) >= max_in_flight:
+                write_next()
+            pending.append((output_path(index, job),
+                            pool.apply_async(worker, (job,))))
+        while pending:
+            write_next()
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return written
+
+
+def main(argv=None):
+    """Command line interface to
+    :func:`jicbioimage.illustrate.batch.illustrate_batch`.
+
+    Reads jobs, one per line, as whitespace separated pairs of paths to an
+    image and to a display list file, and writes the annotated images as PNG
+    files named after the input images to the output directory.
+
+    :param argv: list of command line arguments, defaults to sys.argv[1:]
+    """
+    parser = argparse.ArgumentParser(
+        description="Write annotated images as PNG files.")
+    parser.add_argument("output_dir", help="directory to write PNG files to")
+    parser.add_argument("jobs", nargs="?", type=argparse.FileType("r"),
+                        default=sys.stdin,
+                        help="file with 'IMAGE DISPLAY_LIST' lines "
+                             "(default: stdin)")
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help="number of worker processes")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="maximum number of jobs in flight")
+    parser.add_argument("--normalise", choices=["minmax", "percentile"],
+                        default=None, help="intensity normalisation")
+    parser.add_argument("--compress-level", type=int, default=1,
+                        choices=range(10), metavar="{0-9}",
+                        help="PNG compression level (default: 1)")
+    args = parser.parse_args(argv)
+
+    jobs = (tuple(line.split()) for line in args.jobs if line.strip())
+
+    def output_path(index, job):
+        name = os.path.splitext(os.path.basename(job[0]))[0]
+        return os.path.join(args.output_dir, name + ".png")
+
+    for fpath in illustrate_batch(jobs, output_path,
+                                  processes=args.processes,
+                                  max_in_flight=args.max_in_flight,
+                                  normalise=args.normalise,
+                                  compress_level=args.compress_level):
+        print(fpath)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Module for profiling the drawing methods of canvases.
+
+Profiling records the number of calls, the wall time and the number of
+pixels written by each drawing method of
+:class:`jicbioimage.illustrate.Canvas` and
+:class:`jicbioimage.illustrate.AnnotatedImage`.
+
+>>> from jicbioimage.illustrate import Canvas, profiling
+>>> canvas = Canvas.blank_canvas(50, 50)
+>>> with profiling.profile() as stats:
+...     canvas.draw_crosses([(10, 10), (20, 20)], radius=2)
+>>> stats.as_dict()["draw_crosses"]["pixels"]
+20
+
+Profiling can also be switched on for a whole program by setting the
+``JICBIOIMAGE_ILLUSTRATE_PROFILE`` environment variable to the path of a
+file. The statistics are then written to the file as JSON lines when the
+program exits.
+
+While profiling is switched on the drawing methods are replaced by wrappers
+that record the statistics. When it is switched off the original methods
+are put back, so profiling adds no overhead to drawing unless it is used.
+Only calls made directly are recorded; the time and pixels of drawing
+methods called by other drawing methods are attributed to the outer call.
+Pixel counts of calls made at the same time from several threads may be
+attributed to each other.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import timeit
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from jicbioimage.illustrate import AnnotatedImage, Canvas, _label_value_table
+
+ENVIRONMENT_VARIABLE = "JICBIOIMAGE_ILLUSTRATE_PROFILE"
+
+PROFILED_METHODS = [
+    (Canvas, ["draw_cross", "draw_crosses", "draw_line", "draw_lines",
+              "draw_polyline", "draw_outlines", "mask_region", "text_at",
+              "text_at_many"]),
+    (AnnotatedImage, ["overlay_labels", "overlay_scalar",
+                      "colour_regions_by_value", "label_regions"]),
+]
+
+
+def _overlay_labels_pixels(label_image, palette=None, alpha=1.0,
+                           skip_background=True):
+    """Return the number of pixels written by overlay_labels."""
+    if skip_background:
+        return int(np.count_nonzero(label_image))
+    return int(np.size(label_image))
+
+
+def _overlay_scalar_pixels(field, *args, **kwargs):
+    """Return the number of pixels written by overlay_scalar."""
+    return int(np.size(field) - np.count_nonzero(np.isnan(field)))
+
+
+def _colour_regions_by_value_pixels(label_image, values, *args, **kwargs):
+    """Return the number of pixels written by colour_regions_by_value."""
+    label_image = np.asarray(label_image)
+    table = _label_value_table(values, int(label_image.max()) + 1)
+    return int(np.count_nonzero(~np.isnan(table)[label_image]))
+
+
+# Pixel counts of methods that do not write all of their pixels by indexing
+# the canvas, as functions of the method arguments.
+_PIXEL_COUNTS = dict(overlay_labels=_overlay_labels_pixels,
+                     overlay_scalar=_overlay_scalar_pixels,
+                     colour_regions_by_value=_colour_regions_by_value_pixels)
+
+
+class ProfileStats(object):
+    """Statistics of calls to the drawing methods."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = OrderedDict()
+
+    def record(self, method, time, pixels):
+        """Record a call to a drawing method.
+
+        :param method: name of the method
+        :param time: wall time of the call in seconds
+        :param pixels: number of pixels written
+        """
+        with self._lock:
+            stats = self._stats.setdefault(
+                method, dict(calls=0, time=0., pixels=0))
+            stats["calls"] += 1
+            stats["time"] += time
+            stats["pixels"] += pixels
+
+    def as_dict(self):
+        """Return the statistics as a dictionary.
+
+        :returns: dictionary keyed by method name of dictionaries with the
+                  number of ``calls``, the total wall ``time`` in seconds
+                  and the number of ``pixels`` written
+        """
+        with self._lock:
+            return OrderedDict((method, dict(stats))
+                               for method, stats in self._stats.items())
+
+    def write_json_lines(self, fh):
+        """Write the statistics as one JSON object per method.
+
+        :param fh: file object opened for writing text
+        """
+        for method, stats in self.as_dict().items():
+            record = OrderedDict(method=method)
+            record.update(sorted(stats.items()))
+            fh.write(json.dumps(record) + "\n")
+
+    def clear(self):
+        """Remove all statistics."""
+        with self._lock:
+            self._stats.clear()
+
+
+_active = []
+_originals = []
+_install_lock = threading.RLock()
+_local = threading.local()
+_pixel_lock = threading.Lock()
+_pixels_written = [0]
+
+
+def _indexed_pixels(array, key):
+    """Return the number of pixels of an array selected by an index."""
+    # Index an array of the same shape with zero sized items to find the
+    # size of the selection without allocating or copying any data.
+    dummy = np.empty(array.shape, dtype=[])
+    channels = array.shape[-1] if array.shape[-1:] == (3,) else 1
+    return dummy[key].size // channels
+
+
+def _setitem(original):
+    """Return Canvas.__setitem__ replacement counting the pixels written."""
+    def __setitem__(self, key, value):
+        original(self, key, value)
+        pixels = _indexed_pixels(self, key)
+        with _pixel_lock:
+            _pixels_written[0] += pixels
+    return __setitem__
+
+
+def _profiled(name, method):
+    """Return wrapper of a drawing method recording its statistics."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(_local, "busy", False):
+            return method(self, *args, **kwargs)
+        _local.busy = True
+        pixels_before = _pixels_written[0]
+        start = timeit.default_timer()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            time = timeit.default_timer() - start
+            _local.busy = False
+            if name in _PIXEL_COUNTS:
+                pixels = _PIXEL_COUNTS[name](*args, **kwargs)
+            else:
+                pixels = _pixels_written[0] - pixels_before
+            for stats in list(_active):
+                stats.record(name, time, pixels)
+    return wrapper
+
+
+def _install():
+    """Replace the drawing methods by profiling wrappers."""
+    original = Canvas.__dict__.get("__setitem__")
+    _originals.append((Canvas, "__setitem__", original))
+    Canvas.__setitem__ = _setitem(
+        original or super(Canvas, Canvas).__setitem__)
+    for cls, names in PROFILED_METHODS:
+        for name in names:
+            method = cls.__dict__[name]
+            _originals.append((cls, name, method))
+            setattr(cls, name, _profiled(name, method))
+
+
+def _uninstall():
+    """Put back the original drawing methods."""
+    while _originals:
+        cls, name, method = _originals.pop()
+        if method is None:
+            delattr(cls, name)
+        else:
+            setattr(cls, name, method)
+
+
+def start(stats=None):
+    """Start recording statistics.
+
+    :param stats: :class:`jicbioimage.illustrate.profiling.ProfileStats` to
+                  record to, by default a new one
+    :returns: :class:`jicbioimage.illustrate.profiling.ProfileStats`
+    """
+    if stats is None:
+        stats = ProfileStats()
+    with _install_lock:
+        if not _active:
+            _install()
+        _active.append(stats)
+    return stats
+
+
+def stop(stats):
+    """Stop recording statistics.
+
+    :param stats: :class:`jicbioimage.illustrate.profiling.ProfileStats`
+                  returned by :func:`jicbioimage.illustrate.profiling.start`
+    """
+    with _install_lock:
+        if stats in _active:
+            _active.remove(stats)
+        if not _active:
+            _uninstall()
+
+
+@contextmanager
+def profile(stats=None):
+    """Context manager recording statistics of the drawing methods.
+
+    :param stats: :class:`jicbioimage.illustrate.profiling.ProfileStats` to
+                  record to, by default a new one
+    :returns: :class:`jicbioimage.illustrate.profiling.ProfileStats`
+    """
+    stats = start(stats)
+    try:
+        yield stats
+    finally:
+        stop(stats)
+
+
+def _profile_from_environment():
+    """Profile the program if the environment variable is set."""
+    fpath = os.environ.get(ENVIRONMENT_VARIABLE)
+    if not fpath:
+        return
+    stats = start()
+
+    def write():
+        with open(fpath, "w") as fh:
+            stats.write_json_lines(fh)
+
+    atexit.register(write)
+
+
+_profile_from_environment()
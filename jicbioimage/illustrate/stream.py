@@ -0,0 +1,127 @@
+"""Module for writing annotated time-lapse images frame by frame.
+
+The :class:`jicbioimage.illustrate.stream.FrameWriter` class draws every
+frame onto the same canvas buffer and appends the frames to a multi-page
+TIFF or animated GIF file as they are written, so that the memory needed
+does not depend on the number of frames.
+
+>>> from jicbioimage.illustrate.stream import FrameWriter
+>>> with FrameWriter("timelapse.tif") as writer:  # doctest: +SKIP
+...     for im, points in zip(frames, centroids):
+...         canvas = writer.canvas(im)
+...         canvas.draw_crosses(points)
+...         writer.write(canvas)
+"""
+
+import os.path
+
+import numpy as np
+import PIL.GifImagePlugin
+import PIL.Image
+import PIL.TiffImagePlugin
+
+from jicbioimage.illustrate import AnnotatedImage
+
+
+class FrameWriter(object):
+    """Append annotated frames to a multi-page TIFF or animated GIF file.
+
+    :param fpath: path to output file
+    :param format: "TIFF" or "GIF"; by default inferred from the file
+                   extension
+    :param normalise: normalise option used by
+                      :func:`jicbioimage.illustrate.FrameWriter.canvas`
+    :param duration: display time of each GIF frame in milliseconds
+    :param loop: number of times to loop a GIF, 0 means forever
+    :raises: ValueError if the format is not supported
+    """
+
+    def __init__(self, fpath, format=None, normalise=None, duration=100,
+                 loop=0):
+        if format is None:
+            format = os.path.splitext(fpath)[1][1:]
+        format = format.upper()
+        format = dict(TIF="TIFF").get(format, format)
+        if format == "TIFF":
+            self._fh = PIL.TiffImagePlugin.AppendingTiffWriter(fpath,
+                                                               new=True)
+        elif format == "GIF":
+            self._fh = open(fpath, "wb")
+        else:
+            raise ValueError("Unsupported format: {}".format(format))
+        self.format = format
+        self.normalise = normalise
+        self.duration = duration
+        self.loop = loop
+        self.num_frames = 0
+        self._frame_shape = None
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, tb):
+        self.close()
+
+    def canvas(self, im, channels_on=(True, True, True)):
+        """Return a canvas for the next frame.
+
+        The canvas is created from a grayscale image, see
+        :func:`jicbioimage.illustrate.AnnotatedImage.from_grayscale`, and
+        shares its memory with the canvases of the previous frames.
+
+        :param im: single channel image
+        :param channels_on: channels to populate with input image
+        :returns: :class:`jicbioimage.illustrate.AnnotatedImage`
+        """
+        if self._buffer is None:
+            self._buffer = np.empty(np.shape(im) + (3,), dtype=np.uint8)
+        return AnnotatedImage.from_grayscale(im, channels_on,
+                                             normalise=self.normalise,
+                                             out=self._buffer)
+
+    def write(self, canvas, display_list=None):
+        """Append a canvas to the file as the next frame.
+
+        :param canvas: :class:`jicbioimage.illustrate.Canvas`
+        :param display_list: :class:`jicbioimage.illustrate.DisplayList` to
+                             render onto the canvas before writing it
+        :raises: ValueError if the canvas is not the same size as the
+                 previous frames
+        """
+        if display_list is not None:
+            display_list.render(canvas)
+        if self._frame_shape is None:
+            self._frame_shape = canvas.shape
+        elif canvas.shape != self._frame_shape:
+            raise ValueError(
+                "Frame of shape {} differs from previous frames {}".format(
+                    canvas.shape, self._frame_shape))
+        image = PIL.Image.fromarray(np.ascontiguousarray(canvas))
+        if self.format == "TIFF":
+            image.save(self._fh, format="TIFF")
+            self._fh.newFrame()
+        else:
+            self._write_gif_frame(image)
+        self.num_frames += 1
+
+    def _write_gif_frame(self, image):
+        image = image.quantize(256)
+        if self.num_frames == 0:
+            header, _ = PIL.GifImagePlugin.getheader(image,
+                                                     info=dict(loop=self.loop))
+            self._fh.write(b"".join(header))
+        data = PIL.GifImagePlugin.getdata(image, duration=self.duration,
+                                          include_color_table=True)
+        self._fh.write(b"".join(data))
+
+    def close(self):
+        """Finish writing the file.
+
+        The file is left empty if no frames were written.
+        """
+        if self._fh.closed:
+            return
+        if self.format == "GIF" and self.num_frames > 0:
+            self._fh.write(b";")
+        self._fh.close()
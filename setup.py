@@ -49,6 +49,11 @@ setup(name="jicbioimage.illustrate",
         "Topic :: Scientific/Engineering :: Image Recognition",
       ],
       keywords = ["microscopy", "image analysis"],
+      entry_points={
+        "console_scripts": [
+          "jicbioimage-illustrate=jicbioimage.illustrate.batch:main",
+        ],
+      },
       cmdclass={"test": NoseTestCommand},
       tests_require=["nose", "coverage"],
       install_requires=[
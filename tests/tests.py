@@ -16,6 +16,28 @@ class UnitTests(unittest.TestCase):
         import jicbioimage.illustrate
         self.assertTrue(isinstance(jicbioimage.illustrate.__version__, str))
 
+    def test_import_time_budget(self):
+        # Importing the package should not import its heavy dependencies,
+        # which are only needed once something is drawn or saved.
+        import json
+        import subprocess
+        import sys
+        script = "\n".join([
+            "import json, sys, timeit",
+            "import numpy",
+            "start = timeit.default_timer()",
+            "import jicbioimage.illustrate",
+            "time = timeit.default_timer() - start",
+            "heavy = ['PIL', 'skimage', 'scipy', 'jicbioimage.core.image',",
+            "         'multiprocessing.pool']",
+            "loaded = [m for m in heavy if m in sys.modules]",
+            "print(json.dumps([time, loaded]))",
+        ])
+        output = subprocess.check_output([sys.executable, "-c", script])
+        time, loaded = json.loads(output.decode())
+        self.assertEqual(loaded, [])
+        self.assertTrue(time < 0.25, "import took {:.3f}s".format(time))
+
 
 class CanvasUnitTests(unittest.TestCase):
 
@@ -28,6 +50,17 @@ class CanvasUnitTests(unittest.TestCase):
         self.assertEqual(canvas.dtype, np.uint8)
         self.assertEqual(np.sum(canvas), 0)
 
+    def test_iter_tiles(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(width=5, height=3)
+        tiles = list(canvas.iter_tiles(tile_shape=(2, 3)))
+        self.assertEqual([position for position, tile in tiles],
+                         [(0, 0), (0, 3), (2, 0), (2, 3)])
+        self.assertEqual([tile.shape[:2] for position, tile in tiles],
+                         [(2, 3), (2, 2), (1, 3), (1, 2)])
+        tiles[3][1][:] = 1
+        self.assertEqual(np.sum(canvas), 6)
+
     def test_draw_cross(self):
         from jicbioimage.illustrate import Canvas
         canvas = Canvas.blank_canvas(width=3, height=3)
@@ -74,6 +107,46 @@ class CanvasUnitTests(unittest.TestCase):
             canvas.draw_cross(position=(1, 3), color=(1, 1, 1), radius=1)
         with self.assertRaises(IndexError):
             canvas.draw_cross(position=(3, 1), color=(1, 1, 1), radius=1)
+        with self.assertRaises(IndexError):
+            canvas.draw_cross(position=(-1, 1), color=(1, 1, 1), radius=1)
+        self.assertEqual(np.sum(canvas), 0)
+
+    def test_draw_cross_thickness(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(width=5, height=5)
+        canvas.draw_cross(position=(2, 2), color=(1, 1, 1), radius=2,
+                          thickness=3)
+        layer = np.array([[0, 1, 1, 1, 0],
+                          [1, 1, 1, 1, 1],
+                          [1, 1, 1, 1, 1],
+                          [1, 1, 1, 1, 1],
+                          [0, 1, 1, 1, 0]], dtype=np.uint8)
+        expected = np.dstack([layer, layer, layer])
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_draw_cross_x_style(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(width=4, height=4)
+        canvas.draw_cross(position=(1, 1), color=(1, 1, 1), radius=2,
+                          style="x")
+        layer = np.array([[1, 0, 1, 0],
+                          [0, 1, 0, 0],
+                          [1, 0, 1, 0],
+                          [0, 0, 0, 1]], dtype=np.uint8)
+        expected = np.dstack([layer, layer, layer])
+        self.assertTrue(np.array_equal(canvas, expected))
+        with self.assertRaises(ValueError):
+            canvas.draw_cross(position=(1, 1), style="X")
+
+    def test_draw_cross_float_radius(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(width=3, height=3)
+        canvas.draw_cross(position=(1, 1), color=(1, 1, 1), radius=1.0)
+        expected = Canvas.blank_canvas(width=3, height=3)
+        expected.draw_cross(position=(1, 1), color=(1, 1, 1), radius=1)
+        self.assertTrue(np.array_equal(canvas, expected))
+        canvas.draw_cross(position=(1, 1), color=(1, 1, 1),
+                          radius=np.float64(1), thickness=1.0, style="x")
 
     def test_mask_region(self):
         from jicbioimage.illustrate import Canvas
@@ -84,6 +157,85 @@ class CanvasUnitTests(unittest.TestCase):
         self.assertEqual(np.sum(canvas), 1)
         self.assertTrue(canvas[1, 1, 1])
 
+    def test_mask_region_alpha(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(3, 3)
+        canvas[:] = 100
+        region = np.zeros((3, 3), dtype=bool)
+        region[1, 1:] = True
+        canvas.mask_region(region, color=(200, 0, 100), alpha=0.5)
+        self.assertEqual(canvas.dtype, np.uint8)
+        self.assertEqual(tuple(canvas[1, 1]), (150, 50, 100))
+        self.assertEqual(tuple(canvas[1, 2]), (150, 50, 100))
+        self.assertEqual(tuple(canvas[1, 0]), (100, 100, 100))
+        for alpha in (-0.5, 1.5):
+            with self.assertRaises(ValueError):
+                canvas.mask_region(region, alpha=alpha)
+        self.assertEqual(tuple(canvas[1, 1]), (150, 50, 100))
+
+    def test_mask_region_alpha_uint16(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = np.full((2, 2, 3), 60000, dtype=np.uint16).view(Canvas)
+        region = np.ones((2, 2), dtype=bool)
+        canvas.mask_region(region, color=(0, 60000, 0), alpha=0.5)
+        self.assertEqual(canvas.dtype, np.uint16)
+        self.assertEqual(tuple(canvas[0, 0]), (29882, 60000, 29882))
+
+    def test_mask_region_cropped_mask_with_offset(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(4, 4)
+        cropped = np.array([[1, 0], [1, 1], [0, 1]], dtype=bool)
+        canvas.mask_region(cropped, color=(1, 1, 1), offset=(2, -1))
+        layer = np.array([[0, 0, 0, 0],
+                          [0, 0, 0, 0],
+                          [0, 0, 0, 0],
+                          [1, 0, 0, 0]], dtype=np.uint8)
+        expected = np.dstack([layer, layer, layer])
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_mask_region_coordinates(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(3, 3)
+        rows, cols = np.array([0, 1, 5]), np.array([2, 1, 1])
+        canvas.mask_region((rows, cols), color=(1, 1, 1))
+        layer = np.array([[0, 0, 1], [0, 1, 0], [0, 0, 0]], dtype=np.uint8)
+        expected = np.dstack([layer, layer, layer])
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_mask_empty_region(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(3, 3)
+        canvas.mask_region(np.zeros((3, 3), dtype=bool), alpha=0.5)
+        self.assertEqual(np.sum(canvas), 0)
+
+    def test_draw_outlines(self):
+        from jicbioimage.illustrate import Canvas
+        label_image = np.zeros((5, 7), dtype=int)
+        label_image[1:4, 1:4] = 1
+        label_image[1:4, 4:6] = 2
+        canvas = Canvas.blank_canvas(7, 5)
+        canvas.draw_outlines(label_image, color=(1, 1, 1))
+        layer = np.array([[0, 0, 0, 0, 0, 0, 0],
+                          [0, 1, 1, 1, 1, 1, 0],
+                          [0, 1, 0, 1, 1, 1, 0],
+                          [0, 1, 1, 1, 1, 1, 0],
+                          [0, 0, 0, 0, 0, 0, 0]], dtype=np.uint8)
+        expected = np.dstack([layer, layer, layer])
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_draw_outlines_thickness_and_palette(self):
+        from jicbioimage.illustrate import Canvas
+        label_image = np.zeros((7, 7), dtype=int)
+        label_image[1:6, 1:6] = 2
+        palette = np.array([[0, 0, 0], [0, 0, 0], [0, 9, 0]])
+        canvas = Canvas.blank_canvas(7, 7)
+        canvas.draw_outlines(label_image, color=palette, thickness=2)
+        expected = np.zeros((7, 7), dtype=bool)
+        expected[1:6, 1:6] = True
+        expected[3, 3] = False
+        self.assertTrue(np.array_equal(canvas[:, :, 1] == 9, expected))
+        self.assertEqual(np.sum(canvas[:, :, [0, 2]]), 0)
+
     def test_draw_line(self):
         from jicbioimage.illustrate import Canvas
         canvas = Canvas.blank_canvas(3, 3)
@@ -171,6 +323,343 @@ class CanvasUnitTests(unittest.TestCase):
                        antialias=False, center=True)
         self.assertTrue(np.array_equal(canvas, expected))
 
+    def test_text_at_negative_position_is_clipped(self):
+        # Negative indices used to wrap around to the opposite side.
+        from jicbioimage.illustrate import Canvas
+        reference = Canvas.blank_canvas(width=8, height=8)
+        reference.text_at("e", (0, 0), color=(1, 1, 1), antialias=True)
+        canvas = Canvas.blank_canvas(width=8, height=8)
+        canvas.text_at("e", (-2, -3), color=(1, 1, 1), antialias=True)
+        expected = np.zeros_like(reference)
+        expected[:6, :5] = reference[2:, 3:]
+        self.assertTrue(np.array_equal(canvas, expected))
+
+
+class CanvasBatchUnitTests(unittest.TestCase):
+
+    def test_draw_crosses(self):
+        from jicbioimage.illustrate import Canvas
+        positions = np.array([[1, 1], [2, 3], [4, 0]])
+        colors = np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        radii = np.array([1, 2, 3])
+        expected = Canvas.blank_canvas(width=5, height=5)
+        for position, color, radius in zip(positions, colors, radii):
+            expected.draw_cross(tuple(position), tuple(color), radius)
+        canvas = Canvas.blank_canvas(width=5, height=5)
+        canvas.draw_crosses(positions, colors, radii)
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_draw_crosses_ignores_pixels_outside_canvas(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(width=3, height=3)
+        canvas.draw_crosses([(1, 3), (-1, 1)], color=(1, 1, 1), radius=1)
+        layer = np.array([[0, 1, 0], [0, 0, 1], [0, 0, 0]], dtype=np.uint8)
+        expected = np.dstack([layer, layer, layer])
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_draw_lines(self):
+        from jicbioimage.illustrate import Canvas
+        segments = np.array([[(0.2, 0.3), (1.9, 7.2)],
+                             [(6, 1), (0, 3)],
+                             [(4, 4), (4, 4)]])
+        colors = np.array([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        expected = Canvas.blank_canvas(width=8, height=8)
+        for (pos1, pos2), color in zip(segments, colors):
+            expected.draw_line(tuple(pos1), tuple(pos2), tuple(color))
+        canvas = Canvas.blank_canvas(width=8, height=8)
+        canvas.draw_lines(segments, colors)
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_draw_lines_width(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(width=12, height=8)
+        canvas.draw_lines([[(3, 2), (3, 9)], [(0, 0), (7, 0)]],
+                          color=(255, 0, 0), width=[2, 1])
+        expected = np.zeros((8, 12), dtype=bool)
+        expected[:, 0] = True
+        rows = np.flatnonzero(canvas[:, 5, 0])
+        self.assertEqual(len(rows), 2)
+        expected[rows, 2:10] = True
+        self.assertTrue(np.array_equal(canvas[:, :, 0] == 255, expected))
+
+    def test_draw_lines_antialias(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(width=10, height=10)
+        canvas[:] = 100
+        canvas.draw_lines([[(2, 1), (2, 8)], [(5.5, 1), (5.5, 8)]],
+                          color=(200, 200, 200), antialias=True)
+        self.assertEqual(tuple(canvas[2, 4]), (200, 200, 200))
+        self.assertEqual(tuple(canvas[1, 4]), (100, 100, 100))
+        self.assertEqual(tuple(canvas[5, 4]), (150, 150, 150))
+        self.assertEqual(tuple(canvas[6, 4]), (150, 150, 150))
+        self.assertEqual(tuple(canvas[8, 4]), (100, 100, 100))
+
+    def test_draw_line_width_uses_draw_lines(self):
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(width=10, height=10)
+        canvas.draw_line((1, 1), (8, 6), color=(0, 255, 0), width=3,
+                         antialias=True)
+        expected = Canvas.blank_canvas(width=10, height=10)
+        expected.draw_lines([[(1, 1), (8, 6)]], color=(0, 255, 0), width=3,
+                            antialias=True)
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_draw_polyline(self):
+        from jicbioimage.illustrate import Canvas
+        points = [(1, 1), (6, 1), (6, 8)]
+        canvas = Canvas.blank_canvas(width=10, height=10)
+        canvas.draw_polyline(points, color=(1, 2, 3), closed=True)
+        expected = Canvas.blank_canvas(width=10, height=10)
+        for pos1, pos2 in zip(points, points[1:] + points[:1]):
+            expected.draw_line(pos1, pos2, color=(1, 2, 3))
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_draw_polyline_antialias_blends_overlaps(self):
+        from jicbioimage.illustrate import Canvas
+        points = [(3, 3), (10, 15), (17, 3)]
+        canvas = Canvas.blank_canvas(width=20, height=20)
+        canvas.draw_polyline(points, color=(255, 255, 255), width=4,
+                             antialias=True)
+        expected = Canvas.blank_canvas(width=20, height=20)
+        for pos1, pos2 in zip(points, points[1:]):
+            expected.draw_line(pos1, pos2, color=(255, 255, 255), width=4,
+                               antialias=True)
+        self.assertTrue(np.array_equal(canvas, expected))
+        segments = [[(2, 2), (17, 17)], [(2, 17), (17, 2)]]
+        for threads in (None, 2):
+            canvas = Canvas.blank_canvas(width=20, height=20)
+            canvas.draw_lines(segments, color=(200, 100, 50), width=3,
+                              antialias=True, threads=threads)
+            expected = Canvas.blank_canvas(width=20, height=20)
+            for pos1, pos2 in segments:
+                expected.draw_line(pos1, pos2, color=(200, 100, 50), width=3,
+                                   antialias=True)
+            self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_draw_lines_antialias_threads(self):
+        from jicbioimage.illustrate import Canvas
+        segments = np.random.RandomState(0).uniform(-5, 45, (50, 2, 2))
+        canvas = Canvas.blank_canvas(width=40, height=40)
+        canvas.draw_lines(segments, width=2.5, antialias=True)
+        threaded = Canvas.blank_canvas(width=40, height=40)
+        threaded.draw_lines(segments, width=2.5, antialias=True, threads=3)
+        self.assertTrue(np.array_equal(canvas, threaded))
+
+    def test_text_at_many(self):
+        from jicbioimage.illustrate import Canvas
+        texts = ["1", "22", "1", "3"]
+        positions = np.array([[2, 3], [10, 8], [12, 10], [20, 20]])
+        colors = np.array([[255, 0, 0], [0, 255, 0], [0, 0, 255], [9, 9, 9]])
+        for antialias in (True, False):
+            expected = Canvas.blank_canvas(width=25, height=25)
+            for text, position, color in zip(texts, positions, colors):
+                expected.text_at(text, tuple(position), tuple(color),
+                                 antialias=antialias, center=True)
+            canvas = Canvas.blank_canvas(width=25, height=25)
+            canvas.text_at_many(texts, positions, colors,
+                                antialias=antialias, center=True)
+            self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_threads_give_identical_output(self):
+        from jicbioimage.illustrate import Canvas
+        random_state = np.random.RandomState(0)
+        positions = random_state.randint(-5, 45, size=(500, 2))
+        colors = random_state.randint(0, 256, size=(500, 3))
+        segments = random_state.uniform(-5, 45, size=(500, 2, 2))
+        texts = [str(i) for i in range(500)]
+        serial = Canvas.blank_canvas(40, 40)
+        serial.draw_lines(segments, colors)
+        serial.draw_crosses(positions, colors, radius=3)
+        serial.text_at_many(texts, positions, colors, antialias=True)
+        for threads in (2, 3, 7):
+            parallel = Canvas.blank_canvas(40, 40)
+            parallel.draw_lines(segments, colors, threads=threads)
+            parallel.draw_crosses(positions, colors, radius=3,
+                                  threads=threads)
+            parallel.text_at_many(texts, positions, colors, antialias=True,
+                                  threads=threads)
+            self.assertTrue(np.array_equal(parallel, serial))
+
+
+class GlyphCacheUnitTests(unittest.TestCase):
+
+    def test_glyph_hits_and_misses(self):
+        from jicbioimage.illustrate import GlyphCache
+        cache = GlyphCache()
+        first = cache.glyph("12", size=12, antialias=False)
+        second = cache.glyph("12", size=12, antialias=False)
+        self.assertTrue(first is second)
+        self.assertEqual(first.dtype, bool)
+        self.assertFalse(first.flags.writeable)
+        cache.glyph("12", size=12, antialias=True)
+        info = cache.info()
+        self.assertEqual(info["glyphs"]["hits"], 1)
+        self.assertEqual(info["glyphs"]["misses"], 2)
+        self.assertEqual(info["fonts"]["misses"], 1)
+        self.assertEqual(info["fonts"]["hits"], 1)
+
+    def test_lru_eviction(self):
+        from jicbioimage.illustrate import GlyphCache
+        cache = GlyphCache(max_glyphs=2)
+        cache.glyph("a", size=12, antialias=False)
+        cache.glyph("b", size=12, antialias=False)
+        cache.glyph("a", size=12, antialias=False)
+        cache.glyph("c", size=12, antialias=False)
+        self.assertEqual(cache.info()["glyphs"]["size"], 2)
+        cache.glyph("a", size=12, antialias=False)
+        self.assertEqual(cache.info()["glyphs"]["hits"], 2)
+        cache.glyph("b", size=12, antialias=False)
+        self.assertEqual(cache.info()["glyphs"]["misses"], 4)
+
+    def test_clear(self):
+        from jicbioimage.illustrate import GlyphCache
+        cache = GlyphCache()
+        cache.glyph("a", size=12, antialias=False)
+        cache.clear()
+        self.assertEqual(cache.info()["glyphs"],
+                         dict(hits=0, misses=0, size=0, maxsize=4096))
+
+
+class ProfilingUnitTests(unittest.TestCase):
+
+    def test_profile(self):
+        from jicbioimage.illustrate import Canvas, profiling
+        canvas = Canvas.blank_canvas(20, 20)
+        with profiling.profile() as stats:
+            canvas.draw_crosses([(5, 5), (10, 10)], radius=1)
+            canvas.draw_cross((5, 5), radius=2)
+            canvas.draw_cross((6, 6), radius=2)
+            canvas.draw_line((0, 0), (0, 9), width=3)
+            canvas.mask_region(np.ones((2, 3), dtype=bool), offset=(1, 1))
+        canvas.draw_cross((5, 5))
+        stats = stats.as_dict()
+        self.assertEqual(list(stats), ["draw_crosses", "draw_cross",
+                                       "draw_line", "mask_region"])
+        self.assertEqual(stats["draw_crosses"]["calls"], 1)
+        self.assertEqual(stats["draw_crosses"]["pixels"], 12)
+        self.assertEqual(stats["draw_cross"]["calls"], 2)
+        self.assertEqual(stats["draw_cross"]["pixels"], 20)
+        self.assertEqual(stats["mask_region"]["pixels"], 6)
+        self.assertTrue(stats["draw_line"]["time"] > 0)
+
+    def test_profiling_switched_off(self):
+        from jicbioimage.illustrate import Canvas, AnnotatedImage, profiling
+        draw_cross = Canvas.__dict__["draw_cross"]
+        overlay_labels = AnnotatedImage.__dict__["overlay_labels"]
+        with profiling.profile():
+            self.assertFalse(Canvas.__dict__["draw_cross"] is draw_cross)
+        self.assertTrue(Canvas.__dict__["draw_cross"] is draw_cross)
+        self.assertTrue(
+            AnnotatedImage.__dict__["overlay_labels"] is overlay_labels)
+        self.assertFalse("__setitem__" in Canvas.__dict__)
+
+    def test_write_json_lines(self):
+        import io
+        import json
+        from jicbioimage.illustrate import AnnotatedImage, profiling
+        canvas = AnnotatedImage.from_grayscale(np.zeros((4, 4)))
+        with profiling.profile() as stats:
+            canvas.overlay_labels(np.eye(4, dtype=int))
+        fh = io.StringIO()
+        stats.write_json_lines(fh)
+        record = json.loads(fh.getvalue())
+        self.assertEqual(record["method"], "overlay_labels")
+        self.assertEqual(record["calls"], 1)
+        self.assertEqual(record["pixels"], 4)
+
+
+class DisplayListUnitTests(unittest.TestCase):
+
+    def test_render_matches_drawing_directly(self):
+        from jicbioimage.illustrate import Canvas, DisplayList
+        region = np.zeros((20, 20), dtype=bool)
+        region[2:8, 3:9] = True
+        expected = Canvas.blank_canvas(20, 20)
+        display_list = DisplayList()
+        for target in (expected, display_list):
+            target.mask_region(region, color=(0, 1, 0))
+            target.mask_region(region.T, color=(200, 0, 0), alpha=0.5)
+            target.draw_line((0, 0), (19, 12), color=(1, 2, 3))
+            target.draw_cross((10, 10), color=(4, 5, 6), radius=2)
+            target.text_at("7", (12, 2), color=(7, 8, 9), center=True)
+        self.assertEqual(len(display_list), 5)
+        canvas = display_list.render(Canvas.blank_canvas(20, 20))
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_render_layers(self):
+        from jicbioimage.illustrate import Canvas, DisplayList
+        display_list = DisplayList()
+        display_list.draw_cross((1, 1), color=(1, 1, 1), radius=1,
+                                layer="crosses")
+        display_list.draw_line((0, 0), (2, 2), layer="lines")
+        self.assertEqual(display_list.layers, ["crosses", "lines"])
+        canvas = display_list.render(Canvas.blank_canvas(3, 3),
+                                     layers=["crosses"])
+        self.assertEqual(np.sum(canvas), 15)
+
+    def test_set_color(self):
+        from jicbioimage.illustrate import Canvas, DisplayList
+        display_list = DisplayList()
+        display_list.draw_crosses([(1, 1)], color=(1, 1, 1), radius=1,
+                                  layer="crosses")
+        display_list.set_color("crosses", (0, 2, 0))
+        canvas = display_list.render(Canvas.blank_canvas(3, 3))
+        self.assertEqual(np.sum(canvas), 10)
+        self.assertEqual(np.sum(canvas[:, :, 1]), 10)
+
+    def test_render_scaled(self):
+        from jicbioimage.illustrate import Canvas, DisplayList
+        display_list = DisplayList()
+        display_list.draw_cross((2, 3), color=(1, 1, 1), radius=1)
+        display_list.mask_region((np.array([0]), np.array([0])),
+                                 color=(1, 1, 1))
+        canvas = display_list.render(Canvas.blank_canvas(10, 10), scale=2)
+        expected = Canvas.blank_canvas(10, 10)
+        expected.draw_cross((4, 6), color=(1, 1, 1), radius=2)
+        expected[0:2, 0:2] = 1
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_sparse_region(self):
+        from jicbioimage.illustrate import Canvas, DisplayList
+        display_list = DisplayList()
+        display_list.mask_region(([0, 40000], [0, 40000]), color=(1, 1, 1))
+        display_list.mask_region(([1, 9], [8, 2]), color=(2, 2, 2),
+                                 alpha=0.5)
+        self.assertEqual(len(display_list._region_bits), 0)
+        canvas = display_list.render(Canvas.blank_canvas(20, 20), scale=2)
+        expected = Canvas.blank_canvas(20, 20)
+        expected[0:2, 0:2] = 1
+        expected[2:4, 16:18] = 1
+        expected[18:20, 4:6] = 1
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_render_text_in_recorded_order(self):
+        from jicbioimage.illustrate import Canvas, DisplayList
+        expected = Canvas.blank_canvas(20, 20)
+        display_list = DisplayList()
+        for target in (expected, display_list):
+            target.text_at("8", (2, 2), color=(255, 0, 0), size=16)
+            target.text_at("8", (2, 2), color=(0, 255, 0), size=10)
+            target.text_at("8", (2, 2), color=(0, 0, 255), size=16)
+        canvas = display_list.render(Canvas.blank_canvas(20, 20))
+        self.assertTrue(np.array_equal(canvas, expected))
+        with self.assertRaises(ValueError):
+            display_list.text_at_many(["1", "2"], [(0, 0), (1, 1), (2, 2)])
+        self.assertEqual(len(display_list), 3)
+
+    def test_render_wide_lines(self):
+        from jicbioimage.illustrate import Canvas, DisplayList
+        expected = Canvas.blank_canvas(20, 20)
+        expected.draw_lines([[(2, 2), (16, 8)]], color=(1, 2, 3), width=2)
+        expected.draw_polyline([(2, 2), (8, 16), (18, 18)], color=(4, 5, 6),
+                               width=4, antialias=True)
+        display_list = DisplayList()
+        display_list.draw_polyline([(1, 1), (4, 8), (9, 9)], color=(4, 5, 6),
+                                   width=2, antialias=True)
+        display_list.draw_line((1, 1), (8, 4), color=(1, 2, 3))
+        canvas = display_list.render(Canvas.blank_canvas(20, 20), scale=2)
+        self.assertTrue(np.array_equal(canvas, expected))
+
 
 class AnnotatedImage(unittest.TestCase):
 
@@ -195,6 +684,195 @@ class AnnotatedImage(unittest.TestCase):
         cyan_canvas = AnnIm.from_grayscale(grayscale, (False, True, True))
         self.assertTrue(np.array_equal(cyan_canvas, cyan_expected))
 
+    def test_from_grayscale_normalise(self):
+        from jicbioimage.illustrate import AnnotatedImage as AnnIm
+        im = np.array([[0, 1000], [2000, 4000]], dtype=np.uint16)
+        canvas = AnnIm.from_grayscale(im, normalise="minmax")
+        self.assertEqual(canvas.dtype, np.uint8)
+        self.assertTrue(np.array_equal(canvas[:, :, 0],
+                                       [[0, 64], [128, 255]]))
+        canvas = AnnIm.from_grayscale(im, normalise=(1000, 3000))
+        self.assertTrue(np.array_equal(canvas[:, :, 1],
+                                       [[0, 0], [128, 255]]))
+        canvas = AnnIm.from_grayscale(im, normalise="percentile",
+                                      percentiles=(0, 50))
+        self.assertTrue(np.array_equal(canvas[:, :, 2],
+                                       [[0, 170], [255, 255]]))
+        with self.assertRaises(ValueError):
+            AnnIm.from_grayscale(im, normalise="unknown")
+
+    def test_from_grayscale_out(self):
+        from jicbioimage.illustrate import AnnotatedImage as AnnIm
+        grayscale = np.array([[0, 10], [20, 30]], dtype=np.uint8)
+        out = np.ones((2, 2, 3), dtype=np.uint8)
+        canvas = AnnIm.from_grayscale(grayscale, (True, False, True), out=out)
+        self.assertTrue(isinstance(canvas, AnnIm))
+        self.assertTrue(np.shares_memory(canvas, out))
+        zeros = np.zeros((2, 2), dtype=np.uint8)
+        expected = np.dstack([grayscale, zeros, grayscale])
+        self.assertTrue(np.array_equal(out, expected))
+        with self.assertRaises(ValueError):
+            AnnIm.from_grayscale(grayscale, out=np.ones((3, 2, 3), np.uint8))
+        with self.assertRaises(ValueError):
+            AnnIm.from_grayscale(grayscale, out=np.ones((2, 2, 3), float))
+
+    def test_from_channels(self):
+        from jicbioimage.illustrate import AnnotatedImage as AnnIm
+        red = np.array([[0, 100], [200, 50]], dtype=np.uint16)
+        yellow = np.array([[10, 0], [5, 10]], dtype=np.uint8)
+        canvas = AnnIm.from_channels([red, yellow],
+                                     [(255, 0, 0), (255, 255, 0)],
+                                     [None, (0, 10)], chunk_rows=1)
+        self.assertTrue(isinstance(canvas, AnnIm))
+        self.assertEqual(canvas.dtype, np.uint8)
+        expected = np.array([[[255, 255, 0], [128, 0, 0]],
+                             [[255, 128, 0], [255, 255, 0]]], dtype=np.uint8)
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_from_channels_mismatched_lengths(self):
+        from jicbioimage.illustrate import AnnotatedImage as AnnIm
+        im = np.zeros((2, 2), dtype=np.uint8)
+        with self.assertRaises(ValueError):
+            AnnIm.from_channels([im, im], [(255, 0, 0)])
+
+    def test_overlay_labels(self):
+        from jicbioimage.illustrate import AnnotatedImage as AnnIm
+        canvas = AnnIm.from_grayscale(np.full((2, 2), 5, dtype=np.uint8))
+        labels = np.array([[0, 1], [2, 1]])
+        palette = np.array([[9, 9, 9], [1, 2, 3], [4, 5, 6]])
+        canvas.overlay_labels(labels, palette=palette)
+        expected = np.array([[[5, 5, 5], [1, 2, 3]],
+                             [[4, 5, 6], [1, 2, 3]]], dtype=np.uint8)
+        self.assertTrue(np.array_equal(canvas, expected))
+        canvas.overlay_labels(labels, palette=palette, skip_background=False)
+        self.assertEqual(tuple(canvas[0, 0]), (9, 9, 9))
+
+    def test_overlay_labels_alpha(self):
+        from jicbioimage.illustrate import AnnotatedImage as AnnIm
+        canvas = AnnIm.from_grayscale(np.full((2, 2), 100, dtype=np.uint8))
+        labels = np.array([[0, 1], [2, 1]])
+        palette = np.array([[0, 0, 0], [200, 200, 200], [0, 0, 0]])
+        canvas.overlay_labels(labels, palette=palette, alpha=0.5)
+        self.assertEqual(canvas.dtype, np.uint8)
+        layer = np.array([[100, 150], [50, 150]], dtype=np.uint8)
+        expected = np.dstack([layer, layer, layer])
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_overlay_labels_default_palette(self):
+        from jicbioimage.illustrate import AnnotatedImage as AnnIm
+        from jicbioimage.illustrate import label_palette
+        canvas = AnnIm.from_grayscale(np.zeros((2, 2), dtype=np.uint8))
+        labels = np.array([[0, 1], [2, 3]])
+        canvas.overlay_labels(labels)
+        palette = label_palette(4)
+        self.assertEqual(palette.dtype, np.uint8)
+        self.assertEqual(tuple(palette[0]), (0, 0, 0))
+        self.assertEqual(len(set(map(tuple, palette))), 4)
+        self.assertTrue(np.array_equal(canvas, palette[labels]))
+
+    def test_overlay_scalar(self):
+        from jicbioimage.illustrate import AnnotatedImage
+        canvas = AnnotatedImage.from_grayscale(np.full((2, 3), 100))
+        field = np.array([[0., 0.5, 1.], [2., -1., np.nan]])
+        canvas.overlay_scalar(field, cmap="gray", vmin=0, vmax=1,
+                              chunk_rows=1)
+        self.assertTrue(np.array_equal(canvas[:, :, 0],
+                                       [[0, 128, 255], [255, 0, 100]]))
+        canvas.overlay_scalar(np.zeros((2, 3)), cmap="hot", vmin=-1, vmax=2,
+                              alpha=0.5)
+        self.assertEqual(tuple(canvas[0, 0]), (128, 0, 0))
+        self.assertEqual(tuple(canvas[1, 2]), (178, 50, 50))
+
+    def test_colormap_lut(self):
+        from jicbioimage.illustrate import colormap_lut
+        lut = colormap_lut("hot")
+        self.assertEqual(lut.shape, (256, 3))
+        self.assertEqual(lut.dtype, np.uint8)
+        self.assertEqual(tuple(lut[0]), (0, 0, 0))
+        self.assertEqual(tuple(lut[-1]), (255, 255, 255))
+        lut = colormap_lut(np.array([[0., 0., 1.], [1., 0., 0.]]))
+        self.assertEqual(tuple(lut[0]), (0, 0, 255))
+        self.assertEqual(tuple(lut[255]), (255, 0, 0))
+        lut = colormap_lut(lambda x: np.stack([x, x, 1 - x, x], axis=-1))
+        self.assertEqual(tuple(lut[255]), (255, 255, 0))
+        with self.assertRaises(ValueError):
+            colormap_lut("no such colormap")
+
+    def test_colour_regions_by_value(self):
+        from jicbioimage.illustrate import AnnotatedImage, profiling
+        labels = np.array([[0, 1, 2], [3, 1, 4]])
+        canvas = AnnotatedImage.from_grayscale(np.full((2, 3), 100))
+        with profiling.profile() as stats:
+            canvas.colour_regions_by_value(labels, {1: 10, 2: 20, 3: 30},
+                                           cmap="gray")
+        self.assertTrue(np.array_equal(canvas[:, :, 0],
+                                       [[100, 0, 128], [255, 0, 100]]))
+        pixels = stats.as_dict()["colour_regions_by_value"]["pixels"]
+        self.assertEqual(pixels, 4)
+        canvas = AnnotatedImage.from_grayscale(np.full((2, 3), 100))
+        canvas.colour_regions_by_value(labels, [5, 0, np.nan, 1, 1],
+                                       cmap="gray", alpha=0.5)
+        self.assertTrue(np.array_equal(canvas[:, :, 0],
+                                       [[100, 50, 100], [178, 50, 178]]))
+
+    def test_label_palette_random(self):
+        from jicbioimage.illustrate import label_palette
+        self.assertTrue(np.array_equal(label_palette(5, seed=1),
+                                       label_palette(5, seed=1)))
+        self.assertFalse(np.array_equal(label_palette(5, seed=1),
+                                        label_palette(5)))
+
+    def test_thumbnail(self):
+        from jicbioimage.illustrate import AnnotatedImage, DisplayList
+        im = np.zeros((60, 100), dtype=np.uint8)
+        im[:, 50:] = 100
+        im[:3, :] = 10
+        display_list = DisplayList()
+        display_list.draw_cross((50, 25), color=(255, 0, 0), radius=10)
+        display_list.draw_line((5, 5), (5, 95), color=(0, 255, 0))
+        thumbnail = AnnotatedImage.thumbnail(im, display_list, size=20)
+        self.assertTrue(isinstance(thumbnail, AnnotatedImage))
+        self.assertEqual(thumbnail.shape, (12, 20, 3))
+        self.assertEqual(tuple(thumbnail[0, 0]), (6, 6, 6))
+        self.assertEqual(tuple(thumbnail[11, 19]), (100, 100, 100))
+        expected = AnnotatedImage.from_grayscale(thumbnail[:, :, 0])
+        expected.draw_line((1, 1), (1, 19), color=(0, 255, 0))
+        expected.draw_cross((10, 5), color=(255, 0, 0), radius=2)
+        self.assertTrue(np.array_equal(thumbnail, expected))
+
+    def test_thumbnail_of_small_image(self):
+        from jicbioimage.illustrate import AnnotatedImage
+        im = np.arange(12, dtype=np.uint8).reshape(3, 4)
+        thumbnail = AnnotatedImage.thumbnail(im, size=20)
+        self.assertTrue(np.array_equal(thumbnail[:, :, 1], im))
+
+    def test_label_regions(self):
+        from jicbioimage.illustrate import AnnotatedImage
+        label_image = np.zeros((60, 60), dtype=int)
+        label_image[5:20, 5:30] = 3
+        label_image[40:55, 10:14] = 7
+        canvas = AnnotatedImage.from_grayscale(np.zeros((60, 60)))
+        labels = canvas.label_regions(label_image, color=(1, 2, 3))
+        self.assertEqual(list(labels), [3, 7])
+        expected = AnnotatedImage.from_grayscale(np.zeros((60, 60)))
+        expected.text_at("3", (12, 17), color=(1, 2, 3), center=True)
+        expected.text_at("7", (47, 11.5), color=(1, 2, 3), center=True)
+        self.assertTrue(np.array_equal(canvas, expected))
+
+    def test_label_regions_overlap(self):
+        from jicbioimage.illustrate import AnnotatedImage
+        label_image = np.zeros((60, 60), dtype=int)
+        label_image[10:30, 10:30] = 1
+        label_image[20:22, 20:22] = 2
+        for overlap, written in [("skip", [1]), ("nudge", [1, 2]),
+                                 ("allow", [1, 2])]:
+            canvas = AnnotatedImage.from_grayscale(np.zeros((60, 60)))
+            labels = canvas.label_regions(label_image, fmt="#{label}",
+                                          overlap=overlap)
+            self.assertEqual(list(labels), written)
+        with self.assertRaises(ValueError):
+            canvas.label_regions(label_image, overlap="ignore")
+
 
 class FunctionalTests(unittest.TestCase):
 
@@ -221,6 +899,195 @@ class FunctionalTests(unittest.TestCase):
         self.assertEqual(canvas[10, 14, 0], 1)
         self.assertEqual(canvas[10, 16, 0], 1)
 
+    def test_memory_mapped_canvas(self):
+        from jicbioimage.illustrate import Canvas
+        fpath = os.path.join(TMP_DIR, "canvas.raw")
+        canvas = Canvas.blank_canvas(50, 75, filename=fpath)
+        self.assertTrue(isinstance(canvas, Canvas))
+        canvas.draw_cross(position=(10, 15), radius=1, color=(1, 0, 0))
+        canvas.text_at("1", (30, 30))
+        canvas.flush()
+        on_disk = np.fromfile(fpath, dtype=np.uint8).reshape(75, 50, 3)
+        self.assertTrue(np.array_equal(on_disk, canvas))
+        self.assertEqual(on_disk[10, 15, 0], 1)
+        del canvas
+
+    def test_save(self):
+        import PIL.Image
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(20, 10)
+        canvas.draw_cross((5, 5), color=(255, 0, 0))
+        for name in ("canvas.png", "canvas.tif"):
+            fpath = os.path.join(TMP_DIR, name)
+            canvas.save(fpath)
+            self.assertTrue(np.array_equal(np.asarray(PIL.Image.open(fpath)),
+                                           canvas))
+        fpath = os.path.join(TMP_DIR, "canvas.jpg")
+        canvas.save(fpath, quality=50)
+        im = PIL.Image.open(fpath)
+        self.assertEqual(im.format, "JPEG")
+        self.assertEqual(im.size, (20, 10))
+
+    def test_save_tile_to_file_object(self):
+        import io
+        import PIL.Image
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(20, 10)
+        canvas.draw_cross((5, 5), color=(255, 0, 0))
+        tile = canvas[2:8, 3:9]
+        output = io.BytesIO()
+        tile.save(output, format="png", compress_level=9)
+        output.seek(0)
+        self.assertTrue(np.array_equal(np.asarray(PIL.Image.open(output)),
+                                       tile))
+        with self.assertRaises(ValueError):
+            tile.save(io.BytesIO())
+
+    def test_save_deepzoom(self):
+        import PIL.Image
+        from xml.etree import ElementTree
+        from jicbioimage.illustrate import Canvas
+        canvas = Canvas.blank_canvas(width=20, height=9)
+        canvas[:, 10:] = 200
+        canvas[0, 0] = 100
+        fpath = os.path.join(TMP_DIR, "slide.dzi")
+        canvas.save_deepzoom(fpath, tile_size=8, overlap=1)
+        root = ElementTree.parse(fpath).getroot()
+        self.assertEqual(root.get("TileSize"), "8")
+        size = root.find("{http://schemas.microsoft.com/deepzoom/2008}Size")
+        self.assertEqual((size.get("Width"), size.get("Height")),
+                         ("20", "9"))
+        tiles_dir = os.path.join(TMP_DIR, "slide_files")
+        self.assertEqual(sorted(os.listdir(tiles_dir), key=int),
+                         [str(level) for level in range(6)])
+        self.assertEqual(sorted(os.listdir(os.path.join(tiles_dir, "5"))),
+                         ["0_0.png", "0_1.png", "1_0.png", "1_1.png",
+                          "2_0.png", "2_1.png"])
+
+        def tile(level, name):
+            fpath = os.path.join(tiles_dir, str(level), name)
+            return np.asarray(PIL.Image.open(fpath))
+
+        self.assertEqual(tile(5, "1_0.png").shape, (9, 10, 3))
+        self.assertEqual(tile(5, "2_1.png").shape, (2, 5, 3))
+        self.assertTrue(np.array_equal(tile(5, "0_0.png"), canvas[:9, :9]))
+        level_4 = tile(4, "0_0.png")
+        self.assertEqual(level_4.shape, (5, 9, 3))
+        self.assertEqual(tuple(level_4[0, 0]), (25, 25, 25))
+        self.assertEqual(tuple(level_4[4, 8]), (200, 200, 200))
+        self.assertEqual(tile(0, "0_0.png").shape, (1, 1, 3))
+
+    def test_display_list_save_and_load(self):
+        from jicbioimage.illustrate import Canvas, DisplayList
+        display_list = DisplayList()
+        display_list.draw_cross((3, 3), layer="crosses")
+        display_list.draw_line((0, 0), (9, 9))
+        display_list.mask_region((np.array([1, 2]), np.array([1, 1])),
+                                 alpha=0.5)
+        display_list.text_at("ab", (5, 5))
+        fpath = os.path.join(TMP_DIR, "display_list.npz")
+        display_list.save(fpath)
+        loaded = DisplayList.load(fpath)
+        self.assertEqual(loaded.layers, ["crosses", "default"])
+        self.assertEqual(len(loaded), 4)
+        self.assertTrue(np.array_equal(
+            loaded.render(Canvas.blank_canvas(10, 10)),
+            display_list.render(Canvas.blank_canvas(10, 10))))
+
+    def test_illustrate_batch(self):
+        import PIL.Image
+        from jicbioimage.illustrate import DisplayList
+        from jicbioimage.illustrate.batch import illustrate_batch
+
+        def jobs():
+            for i in range(5):
+                display_list = DisplayList()
+                display_list.draw_cross((i, i), color=(255, 0, 0), radius=1)
+                yield np.full((8, 8), i, dtype=np.uint8), display_list
+
+        template = os.path.join(TMP_DIR, "annotated_{}.png")
+        written = illustrate_batch(jobs(), template, processes=2,
+                                   max_in_flight=2, warm_texts=["1"])
+        self.assertEqual(written, [template.format(i) for i in range(5)])
+        for i, fpath in enumerate(written):
+            im = np.asarray(PIL.Image.open(fpath))
+            self.assertEqual(im.shape, (8, 8, 3))
+            self.assertEqual(tuple(im[i, i]), (255, 0, 0))
+            self.assertEqual(tuple(im[7, 0]), (i, i, i))
+
+    def test_illustrate_batch_command_line(self):
+        import PIL.Image
+        from jicbioimage.illustrate import DisplayList
+        from jicbioimage.illustrate.batch import main
+        image_path = os.path.join(TMP_DIR, "image.tif")
+        display_list_path = os.path.join(TMP_DIR, "annotations.npz")
+        jobs_path = os.path.join(TMP_DIR, "jobs.txt")
+        PIL.Image.fromarray(np.full((6, 6), 1000, dtype=np.uint16)).save(
+            image_path)
+        display_list = DisplayList()
+        display_list.draw_cross((2, 2), color=(0, 255, 0), radius=1)
+        display_list.save(display_list_path)
+        with open(jobs_path, "w") as fh:
+            fh.write("{} {}\n".format(image_path, display_list_path))
+        output_dir = os.path.join(TMP_DIR, "output")
+        os.mkdir(output_dir)
+        main([output_dir, jobs_path, "--processes", "1",
+              "--normalise", "minmax"])
+        im = np.asarray(PIL.Image.open(os.path.join(output_dir, "image.png")))
+        self.assertEqual(tuple(im[2, 2]), (0, 255, 0))
+        self.assertEqual(tuple(im[0, 0]), (0, 0, 0))
+
+    def test_profiling_environment_variable(self):
+        import json
+        import subprocess
+        import sys
+        fpath = os.path.join(TMP_DIR, "profile.jsonl")
+        env = dict(os.environ, JICBIOIMAGE_ILLUSTRATE_PROFILE=fpath)
+        subprocess.check_call(
+            [sys.executable, "-c",
+             "from jicbioimage.illustrate import Canvas; "
+             "Canvas.blank_canvas(9, 9).draw_cross((4, 4))"], env=env)
+        with open(fpath) as fh:
+            record = json.loads(fh.read())
+        self.assertEqual(record["method"], "draw_cross")
+        self.assertEqual(record["pixels"], 18)
+
+    def test_frame_writer(self):
+        import PIL.Image
+        from jicbioimage.illustrate import AnnotatedImage, DisplayList
+        from jicbioimage.illustrate.stream import FrameWriter
+        for name in ("frames.tif", "frames.gif"):
+            fpath = os.path.join(TMP_DIR, name)
+            with FrameWriter(fpath) as writer:
+                for i in range(3):
+                    canvas = writer.canvas(
+                        np.full((6, 8), 50 * i, dtype=np.uint8))
+                    display_list = DisplayList()
+                    display_list.draw_cross((i, i), color=(255, 0, 0),
+                                            radius=1)
+                    writer.write(canvas, display_list)
+                self.assertEqual(writer.num_frames, 3)
+                with self.assertRaises(ValueError):
+                    writer.write(AnnotatedImage.from_grayscale(
+                        np.zeros((6, 6), dtype=np.uint8)))
+                self.assertEqual(writer.num_frames, 3)
+            im = PIL.Image.open(fpath)
+            self.assertEqual(im.n_frames, 3)
+            for i in range(3):
+                im.seek(i)
+                ar = np.asarray(im.convert("RGB"))
+                self.assertEqual(ar.shape, (6, 8, 3))
+                self.assertEqual(tuple(ar[i, i]), (255, 0, 0))
+                self.assertEqual(tuple(ar[5, 7]), (50 * i,) * 3)
+            fpath = os.path.join(TMP_DIR, "empty_" + name)
+            FrameWriter(fpath).close()
+            self.assertEqual(os.path.getsize(fpath), 0)
+
+    def test_frame_writer_unsupported_format(self):
+        from jicbioimage.illustrate.stream import FrameWriter
+        with self.assertRaises(ValueError):
+            FrameWriter(os.path.join(TMP_DIR, "frames.png"))
+
 
 if __name__ == "__main__":
     unittest.main()